@@ -0,0 +1,124 @@
+#!/usr/bin/python
+"""
+Micro-benchmark for the per-event dispatch overhead of RandomTalks.
+
+Replays the first events of a generated data queue against stub hosts, whose popen
+does not start any process, and reports the time per event spent resolving hosts by
+name and dispatching the consumer. Runs once with the old linear host scan and once
+with the name to host map used by RandomTalks.findHostByName.
+
+Usage:
+./benchmark_dispatch.py [--topo <topology.conf>] [--hosts <n>] [--events <n>] [--repeat <n>]
+Without --topo, a topology with n hosts (default 100) split among the four host types is used.
+
+Created 18/10/2026
+"""
+import sys
+import time
+import types
+import getopt
+import logging
+from datetime import datetime
+
+from icnexperiment.data_generation import DataManager, readHostNamesFromTopoFile
+from random_talks import RandomTalks
+
+# ---------------------------------------- Constants
+c_nHosts          = 100
+c_nEvents         = 20000
+c_nRepeat         = 5
+c_nMissionMinutes = 10
+c_lstHostPrefixes = ['d', 'h', 's', 'v']
+
+class BenchProc:
+
+    def __init__(self, pid):
+        self.pid = pid
+
+class BenchHost:
+
+    def __init__(self, strName):
+        self.name  = strName
+        self.nPids = 0
+
+    def __str__(self):
+        return self.name
+
+    def popen(self, *args, **kwargs):
+        self.nPids += 1
+        return BenchProc(self.nPids)
+
+def findHostLinear(self, strHostName):
+    """
+    Host lookup as done before the name map, scans the whole host list
+    """
+    pResultHost = None
+    for pHost in self.lstHosts:
+        if (str(pHost) == strHostName):
+            pResultHost = pHost
+    return pResultHost
+
+def createExperiment(lstHosts, bLinear):
+    Experiment = RandomTalks(lstHosts, [])
+    Experiment.hshConsumers   = {str(pHost): datetime(1,1,1,0,0) for pHost in lstHosts}
+    Experiment.strPayloadPath = '/tmp/benchmark_dispatch'
+    if (bLinear):
+        Experiment.findHostByName = types.MethodType(findHostLinear, Experiment)
+    return Experiment
+
+def timeLookups(Experiment, lstEvents):
+    sStart = time.perf_counter()
+    for (nTimeMs, pPackage) in lstEvents:
+        Experiment.findHostByName(pPackage.strOrig)
+        Experiment.findHostByName(pPackage.strDest)
+    return time.perf_counter() - sStart
+
+def timeConsumerDispatch(Experiment, lstEvents):
+    sStart = time.perf_counter()
+    for (nTimeMs, pPackage) in lstEvents:
+        Experiment.findHostByName(pPackage.strOrig)
+        pConsumer = Experiment.findHostByName(pPackage.strDest)
+        Experiment.instantiateConsumer(pConsumer, pPackage)
+    return time.perf_counter() - sStart
+
+def bestOf(fnTimer, lstHosts, bLinear, lstEvents, nRepeat):
+    return min(fnTimer(createExperiment(lstHosts, bLinear), lstEvents) for i in range(nRepeat))
+
+def main():
+    strTopoPath = None
+    nHosts      = c_nHosts
+    nEvents     = c_nEvents
+    nRepeat     = c_nRepeat
+
+    opts, args = getopt.getopt(sys.argv[1:], '', ['topo=', 'hosts=', 'events=', 'repeat='])
+    for opt, arg in opts:
+        if (opt == '--topo'):
+            strTopoPath = arg
+        elif (opt == '--hosts'):
+            nHosts = int(arg)
+        elif (opt == '--events'):
+            nEvents = int(arg)
+        elif (opt == '--repeat'):
+            nRepeat = int(arg)
+
+    if (strTopoPath):
+        lstHostNames = readHostNamesFromTopoFile(strTopoPath)
+    else:
+        lstHostNames = ['%s%d' % (c_lstHostPrefixes[i % len(c_lstHostPrefixes)], i // len(c_lstHostPrefixes)) for i in range(nHosts)]
+
+    # Only warnings, the consumer dispatch logs every event
+    logging.getLogger().setLevel(logging.WARNING)
+
+    pDataQueue = DataManager(nTotalReceivers=2).generateVectorDataQueue(lstHostNames, c_nMissionMinutes, nSeed=0)
+    lstEvents  = list(pDataQueue[:nEvents])
+    lstHosts   = [BenchHost(strName) for strName in lstHostNames]
+    print('Hosts=%d, events=%d, best of %d runs' % (len(lstHosts), len(lstEvents), nRepeat))
+
+    for (strName, fnTimer) in [('host lookups', timeLookups), ('consumer dispatch', timeConsumerDispatch)]:
+        sLinear = bestOf(fnTimer, lstHosts, True, lstEvents, nRepeat)
+        sMap    = bestOf(fnTimer, lstHosts, False, lstEvents, nRepeat)
+        print('%-18s linear scan %8.2f us/event, name map %8.2f us/event, speedup %.1fx' %
+            (strName, 1e6*sLinear/len(lstEvents), 1e6*sMap/len(lstEvents), sLinear/sMap))
+
+if __name__ == '__main__':
+    main()
@@ -22,7 +22,7 @@ try:
    from minindn.apps.app_manager import AppManager
    from minindn.apps.nfd import Nfd
    from minindn.apps.nlsr import Nlsr
-   from minindn.helpers.nfdc import Nfdc
+   from minindn.helpers.nfdc import NfdcBatch
    from mininet.node import RemoteController
    g_bMinindnLibsImported = True
 except ImportError:
@@ -30,6 +30,8 @@ except ImportError:
    g_bMinindnLibsImported = False
 
 from icnexperiment.data_generation import DataManager, curDatetimeToFloat, readHostNamesFromTopoFile
+from icnexperiment.generics import g_pHostTable
+from icnexperiment.experiment_runner import EventScheduler
 from icnexperiment.dir_config import c_strLogDir, c_strTopologyDir
 
 # ---------------------------------------- Constants
@@ -38,7 +40,7 @@ c_strLogFile         = c_strLogDir + 'experiment_send.log'
 c_strTopologyFile    = c_strTopologyDir + 'default-topology.conf'
 
 c_sConsumerCooldownSec = 0.0
-c_nSleepThresholdMs    = 100
+c_bPayloadOnTmpfs      = False
 c_sExperimentTimeSec   = 250
 c_nCacheSizeDefault    = 0
 
@@ -62,16 +64,20 @@ logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
 # ---------------------------------------- RandomTalks
 class RandomTalks():
 
-   def __init__(self, lstHosts, lstDataQueue):
+   def __init__(self, lstHosts, lstDataQueue, nStartMs=0):
       """
-      Constructor. Meh
+      Constructor. lstDataQueue can be any iterable of time ordered (nTimeMs, DataPackage) pairs,
+      such as a DataQueue or the generator returned by DataManager.streamDataQueue. It is consumed once by run().
+      nStartMs is the mission time when run() begins, used to replay a slice of the queue starting at that time.
       """
       self.logFile          = None
       self.pDataManager     = DataManager()
-      self.lstHosts         = lstHosts
+      self.lstHosts         = list(lstHosts)
+      self.hshHosts         = {str(pHost): pHost for pHost in lstHosts}
       self.strTTLValues     = 'None'
       self.strPayloadValues = 'None'
-      self.lstDataQueue     = lstDataQueue
+      self.itDataQueue      = iter(lstDataQueue)
+      self.nStartMs         = nStartMs
       self.nBytesConsumed   = 0
       self.hshConsumers     = {}
       self.strPayloadPath   = '/home/vagrant/mock_data'
@@ -85,15 +91,21 @@ class RandomTalks():
       self.nBytesConsumed = 0
       
       self.hshConsumers = {}
+      self.hshHosts     = {}
       for pHost in self.lstHosts:
          self.hshConsumers[str(pHost)] = datetime(1,1,1,0,0)
+         self.hshHosts[str(pHost)] = pHost
+
+      # Host ids follow the host list order when the table is still empty
+      g_pHostTable.internAll([str(pHost) for pHost in self.lstHosts])
 
       # Get TTLs from data manager
       self.strTTLValues     = self.pDataManager.getTTLValuesParam()
       self.strPayloadValues = self.pDataManager.getPayloadValuesParam()
 
-      # Create payload mock files
-      DataManager.createPayloadFiles(self.lstDataQueue, self.strPayloadPath)
+      # Create payload mock files for every known data type, the queue is only read while running.
+      # Returns once all files are ready, so no producer starts before its file exists
+      self.strPayloadPath = DataManager.createPayloadFilesForSizes(self.pDataManager.getPayloadSizes(), self.strPayloadPath, c_bPayloadOnTmpfs)
 
       # Get average payload size from DataManager. This will be used to set cache sizes in the future
       sPayloadAvg = self.pDataManager.avgPayloadSize()
@@ -112,67 +124,36 @@ class RandomTalks():
       """
       logging.info('[RandomTalks.run] Begin, maxExperimentTimeSec=%f' % c_sExperimentTimeSec)
 
-      # Internal parameters
-      dtBegin        = datetime.now()
-      dtNow          = None
-      dtDelta        = timedelta()
-      nDataIndex     = 0
-      sElapsedTimeMs = 0
-      nIteration     = 0
-      sTimeDiffSum   = 0
-      sTimeDiffAvg   = 0
-      while (((sElapsedTimeMs/1000) < c_sExperimentTimeSec) and (nDataIndex < len(self.lstDataQueue))):
-         # Send data until the end of the experiment time
-         # Sweep queue and send data according to the elapsed time
-         dtNow      = datetime.now()
-         dtDelta        = dtNow - dtBegin
-         sElapsedTimeMs = dtDelta.microseconds/1000 + dtDelta.seconds*1000
-         nIteration    += 1
-         logging.debug('[RandomTalks.run] New iteration with sElapsedTimeMs=%s; dtDelta=%s' % (sElapsedTimeMs, str(dtDelta)))
-
-         while (nDataIndex < len(self.lstDataQueue)) and (self.lstDataQueue[nDataIndex][0] <= sElapsedTimeMs):
-            # Send data
-            pDataBuff = self.lstDataQueue[nDataIndex]
-            
-            sTimeDiffMs   = sElapsedTimeMs - pDataBuff[0]
-            sTimeDiffSum += sTimeDiffMs
-            sTimeDiffAvg  = float(sTimeDiffSum)/(nDataIndex+1)
-	    
-            if (sTimeDiffMs > 5):
-               logging.info('[RandomTalks.run] About to send data nDataIndex=%d/%d; elapsedSec=%s; timeDiffMs=%s, timeDiffAvg=%.2f, MBytesConsumed=%.3f' % (nDataIndex, len(self.lstDataQueue)-1, sElapsedTimeMs/1000.0, sTimeDiffMs, sTimeDiffAvg, self.nBytesConsumed/(1024.0*1024.0)))
-
-            # Instantiate consumer and producer host associated in the data package
-            pDataPackage = pDataBuff[1]
-            pProducer = self.findHostByName(pDataPackage.strOrig)
-            pConsumer = self.findHostByName(pDataPackage.strDest)
-
-            # In some setups, producer hosts might be killed by the OS for an unknown reason
-            # This makes sure producers are running correctly during the simulation
-            # As of 03/2021 this is not happening anymore. Possibly because of the call to getPopen(pHost, strCmdConsumer) instead of pHost.cmd (??)
-            # self.checkRunningProducers()
-            if(not self.isProducerRunning(pDataPackage)):
-               self.instantiateProducer(pProducer, pDataPackage)
-               time.sleep(0.2)
-
-            self.instantiateConsumer(pConsumer, pDataPackage)
-            nDataIndex += 1
-
-         if (nDataIndex < len(self.lstDataQueue)):
-            logging.debug('[RandomTalks.run] Waiting to send next data package nDataIndex=%s; pDataBuff[0]=%s; sElapsedTimeMs=%s' %
-               (nDataIndex, self.lstDataQueue[nDataIndex][0], sElapsedTimeMs))
-         else:
-            logging.info('[RandomTalks.run] No more data to send')
-
-         # Wait until next data is ready, if past threshold
-         if (nDataIndex < len(self.lstDataQueue)):
-            nNextStopMs = self.lstDataQueue[nDataIndex][0] - sElapsedTimeMs
-            if (nNextStopMs > c_nSleepThresholdMs):
-               logging.info('[RandomTalks.run] Sleeping until next data nNextStopMs=%s; c_nSleepThresholdMs=%s' % (nNextStopMs, c_nSleepThresholdMs))
-               time.sleep(nNextStopMs/1000.0)
+      # Events are dispatched by a monotonic scheduler at their mission time
+      dtBegin         = datetime.now()
+      self.nDataIndex = 0
+      self.pScheduler = EventScheduler(self.nStartMs)
+      self.pScheduler.run(self.itDataQueue, self.dispatchData, c_sExperimentTimeSec)
+
+      logging.info('[RandomTalks.run] Dispatched %d data packages, lateness %s' % (self.nDataIndex, self.pScheduler.pStats.summary()))
 
       # Close log file
-      logging.info('[RandomTalks.run] Experiment done in %s seconds log written to %s' % (sElapsedTimeMs/1000, c_strLogFile))
+      logging.info('[RandomTalks.run] Experiment done in %s seconds log written to %s' % (self.pScheduler.elapsedMs()/1000, c_strLogFile))
       return (dtBegin, datetime.now())
+
+   def dispatchData(self, nDataTimeMs, pDataPackage):
+      """
+      Sends one data package: starts its producer if needed and the consumer. Called by the scheduler at nDataTimeMs.
+      """
+      # Instantiate consumer and producer host associated in the data package
+      pProducer = self.findHostByName(pDataPackage.strOrig)
+      pConsumer = self.findHostByName(pDataPackage.strDest)
+
+      # In some setups, producer hosts might be killed by the OS for an unknown reason
+      # This makes sure producers are running correctly during the simulation
+      # As of 03/2021 this is not happening anymore. Possibly because of the call to getPopen(pHost, strCmdConsumer) instead of pHost.cmd (??)
+      # self.checkRunningProducers()
+      if(not self.isProducerRunning(pDataPackage)):
+         self.instantiateProducer(pProducer, pDataPackage)
+         time.sleep(0.2)
+
+      self.instantiateConsumer(pConsumer, pDataPackage)
+      self.nDataIndex += 1
  
    def checkRunningProducers(self):
       """
@@ -256,15 +237,20 @@ class RandomTalks():
       else:
          logging.critical('[RandomTalks.instantiateConsumer] Host is nil! host=%s' % str(pHost))
 
+   def addHost(self, pHost):
+      """
+      Adds a host to the experiment, keeping the name lookup up to date
+      """
+      self.lstHosts.append(pHost)
+      self.hshHosts[str(pHost)] = pHost
+      self.hshConsumers[str(pHost)] = datetime(1,1,1,0,0)
+      g_pHostTable.intern(str(pHost))
+
    def findHostByName(self, strHostName):
       """
-      Returns a host found in the host list.
+      Returns a host found in the host list, None if there is none.
       """
-      pResultHost = None
-      for pHost in self.lstHosts:
-         if (str(pHost) == strHostName):
-            pResultHost = pHost
-      return pResultHost  
+      return self.hshHosts.get(strHostName)
 
    @staticmethod
    def getFilterByHostname(strName):
@@ -302,14 +288,14 @@ class MockHost():
       return 0
    
 # ---------------------------------------- runMock
-def runMock(strTopoPath, lstDataQueue):
+def runMock(strTopoPath, lstDataQueue, nStartMs=0):
    """
    Runs mock experiment. No cummunication with Mininet or MiniNDN
    """
    logging.info('[runMock] Running mock experiment')
    lstHostNames = readHostNamesFromTopoFile(strTopoPath)
    lstHosts = [MockHost(strName) for strName in lstHostNames]
-   Experiment = RandomTalks(lstHosts, lstDataQueue)
+   Experiment = RandomTalks(lstHosts, lstDataQueue, nStartMs)
    Experiment.setup()
    Experiment.run()
 
@@ -327,7 +313,7 @@ def setStationIPs(pStation, strIP):
       return
 
 # ---------------------------------------- runExperiment
-def runExperiment(strTopoPath, lstDataQueue, bWifi=True):
+def runExperiment(strTopoPath, lstDataQueue, bWifi=True, nStartMs=0):
    """
    Runs the experiment using regular MiniNDN
    """
@@ -406,12 +392,14 @@ def runExperiment(strTopoPath, lstDataQueue, bWifi=True):
 
    # Advertise faces
    logging.info('[runExperiment] Setting up faces for %d hosts' % len(lstHosts))
+   pBatch = NfdcBatch()
    for pHostOrig in lstHosts:
       for pHostDest in lstHosts:
          if (pHostDest != pHostOrig):
             logging.debug('[runExperiment] Register, pHostOrig=%s; pHostDest=%s' % (str(pHostOrig), str(pHostDest)))
-            Nfdc.createFace(pHostOrig, pHostDest.IP())
-            Nfdc.registerRoute(pHostOrig, RandomTalks.getFilterByHostname(str(pHostDest)), pHostDest.IP())
+            pBatch.createFace(pHostOrig, pHostDest.IP())
+            pBatch.registerRoute(pHostOrig, RandomTalks.getFilterByHostname(str(pHostDest)), pHostDest.IP())
+   pBatch.run()
 
    if (not bWifi):
       ##########################################################
@@ -427,7 +415,7 @@ def runExperiment(strTopoPath, lstDataQueue, bWifi=True):
    ##########################################################
    # Set up and run experiment
    logging.info('[runExperiment] Begin experiment')
-   Experiment = RandomTalks(lstHosts, lstDataQueue)
+   Experiment = RandomTalks(lstHosts, lstDataQueue, nStartMs)
    try:
       logging.info('[runExperiment] Running pingall ...')
       # ndn.net.pingAll()
@@ -510,6 +498,8 @@ def showHelp():
    strHelp += '  --icn:    ICN experiment without specific controller\n'
    strHelp += '  --ip:     IP experiment, no specific controller or cache\n'
    strHelp += '  --ip_sdn: IP with SDN experiment, with Ryu controller and no cache\n'
+   strHelp += '  --start-ms <ms>: replays the queue starting at this mission time\n'
+   strHelp += '  --end-ms <ms>:   replays the queue until this mission time\n'
    print(strHelp)
 
 # ---------------------------------------- Main
@@ -519,8 +509,10 @@ def main():
 
    strMode = 'icn'
    strTopologyPath = ''
+   nStartMs = None
+   nEndMs   = None
    short_options = 'hmt:'
-   long_options  = ['help', 'mock', 'sdn', 'icn', 'ip', 'ip_sdn', 'topology=']
+   long_options  = ['help', 'mock', 'sdn', 'icn', 'ip', 'ip_sdn', 'topology=', 'start-ms=', 'end-ms=']
    opts, args = getopt.getopt(sys.argv[1:], short_options, long_options)
    for opt, arg in opts:
       if opt in ['-h', '--help']:
@@ -539,6 +531,10 @@ def main():
          strMode = 'ip'
       elif opt == '--ip_sdn':
          strMode = 'ip_sdn'
+      elif opt == '--start-ms':
+         nStartMs = int(arg)
+      elif opt == '--end-ms':
+         nEndMs = int(arg)
 
    setNetworkType(strMode)
    # Reset argv arguments for the minindn CLI
@@ -550,9 +546,9 @@ def main():
       showHelp()
       exit(0)
    
-   # Load data queue
-   lstDataQueue = DataManager.loadDataQueueFromTextFile(strTopologyPath)
-   logging.info('[main] Data queue size=%d' % len(lstDataQueue))
+   # Data queue is streamed from file while the experiment runs, starting directly at nStartMs
+   lstDataQueue = DataManager.streamDataQueue(strTopologyPath, nStartMs=nStartMs, nEndMs=nEndMs)
+   nStartMs     = nStartMs or 0
 
    if (g_strNetworkType == ''):
       logging.error('[main] No network type set')
@@ -560,10 +556,10 @@ def main():
       exit(0)
 
    if(g_bIsMockExperiment):
-      runMock(strTopologyPath, lstDataQueue)
+      runMock(strTopologyPath, lstDataQueue, nStartMs)
    else:
       if (g_bMinindnLibsImported):
-         runExperiment(strTopologyPath, lstDataQueue, bWifi=False)
+         runExperiment(strTopologyPath, lstDataQueue, bWifi=False, nStartMs=nStartMs)
       else:
          logging.error('[main] Experiment can not run because MiniNDN libraries could not be imported')
 
@@ -5,6 +5,7 @@ This script generates the data queue use by ICN simulations.
 Created 16/12/2020 by Andre Dexheimer Carneiro
 """
 import sys
+import getopt
 import pickle
 import logging
 
@@ -21,8 +22,12 @@ logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
 
 def main():
     """
-    Generates a data queue saved with pickle which can be read by ICN experiments.
-    The location of the pickle file is defined in DataManager and is set to the same directory as the topology file.
+    Generates a data queue saved as binary and text files which can be read by ICN experiments.
+    The location of the files is defined in DataManager and is set to the same directory as the topology file.
+    Options after the topology file:
+      --seed <n>:    seed for the vectorized generator, runs with the same seed produce the same queue
+      --workers <n>: number of processes used to generate the queue, does not change the result
+      --from-text: converts an existing text queue to the binary format instead of generating a new one
     """
     Manager = DataManager(nTotalReceivers=2)
 
@@ -35,18 +40,40 @@ def main():
     else:
         strTopologyPath = sys.argv[1]
 
+    nSeed     = None
+    nWorkers  = 1
+    bFromText = False
+    opts, args = getopt.getopt(sys.argv[2:], '', ['seed=', 'workers=', 'from-text'])
+    for opt, arg in opts:
+        if (opt == '--seed'):
+            nSeed = int(arg)
+        elif (opt == '--workers'):
+            nWorkers = int(arg)
+        elif (opt == '--from-text'):
+            bFromText = True
+
+    if (bFromText):
+        # Import the text queue into the binary format
+        lstDataQueue = DataManager.loadDataQueueFromTextFile(strTopologyPath)
+        DataManager.saveDataToBinaryFile(lstDataQueue, strTopologyPath)
+        logging.info('[main] Converted %s' % str(lstDataQueue))
+        return
+
     # Read hostnames from the topology file and generate queue
     lstHostNames = readHostNamesFromTopoFile(strTopologyPath)
-    logging.info('[main] Generating queue, missionMinutes= %d; hostnames=%s; topoFile=%s' % (c_nMissionMinutes, str(lstHostNames), strTopologyPath))
+    logging.info('[main] Generating queue, missionMinutes= %d; seed=%s; workers=%d; hostnames=%s; topoFile=%s' % (c_nMissionMinutes, nSeed, nWorkers, str(lstHostNames), strTopologyPath))
     # lstDataQueue = Manager.generateSpreadDataQueue(lstHostNames, c_nMissionMinutes)
-    lstDataQueue = Manager.generateDataQueue(lstHostNames, c_nMissionMinutes)
+    lstDataQueue = Manager.generateVectorDataQueue(lstHostNames, c_nMissionMinutes, nSeed=nSeed, nWorkers=nWorkers)
 
-    # Log resulting data queue
-    for nIndex, node in enumerate(lstDataQueue):
-        logging.debug('[main] Node[' + str(nIndex) + ']: ' + str(node[0]) + ', ' + str(node[1]))
+    # Log resulting data queue, packages are only created when debug logging is enabled
+    if (logging.getLogger().isEnabledFor(logging.DEBUG)):
+        for nIndex, node in enumerate(lstDataQueue):
+            logging.debug('[main] Node[' + str(nIndex) + ']: ' + str(node[0]) + ', ' + str(node[1]))
+    logging.info('[main] Generated %s' % str(lstDataQueue))
 
-    # Store the resulting data queue using pickle
+    # Store the resulting data queue
     # bStatus = DataManager.saveDataQueueToFile(lstDataQueue, strTopologyPath)
+    DataManager.saveDataToBinaryFile(lstDataQueue, strTopologyPath)
     DataManager.saveDataToTextFile(lstDataQueue, strTopologyPath)
 
 
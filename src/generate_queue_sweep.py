@@ -0,0 +1,163 @@
+#!/usr/bin/python
+"""
+Generates the data queues for a sweep of scenarios in one run. Every combination of
+topology, mission minutes, nFactor and number of receivers is one scenario, scenarios
+are generated in parallel and described in a JSON manifest.
+
+Created 18/10/2026
+"""
+import sys
+import json
+import time
+import getopt
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from os import cpu_count
+
+from icnexperiment.data_generation import DataManager, readHostNamesFromTopoFile
+from icnexperiment.dir_config import c_strLogDir, c_strTopologyDir
+
+# ---------------------------------------- Constants
+c_strLogFile      = c_strLogDir + 'generate_queue_sweep.log'
+c_strManifestFile = c_strTopologyDir + 'queue_sweep_manifest.json'
+
+logging.basicConfig(filename=c_strLogFile, format='%(asctime)s %(message)s', level=logging.INFO)
+logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+def scenarioTag(nMissionMinutes, nFactor, nTotalReceivers):
+    """
+    Returns the tag used in the queue file names of a scenario
+    """
+    return 'm%d_f%s_r%d' % (nMissionMinutes, str(nFactor).replace('.', 'p'), nTotalReceivers)
+
+def generateScenario(strTopologyPath, lstHostNames, nMissionMinutes, nFactor, nTotalReceivers, nSeed, bSaveText):
+    """
+    Generates and saves the queue for one scenario, returns its manifest entry.
+    Module level so it can run in worker processes.
+    """
+    sStart     = time.time()
+    strTag     = scenarioTag(nMissionMinutes, nFactor, nTotalReceivers)
+    Manager    = DataManager(nTotalReceivers=nTotalReceivers, nFactor=nFactor)
+    pDataQueue = Manager.generateVectorDataQueue(lstHostNames, nMissionMinutes, nSeed=nSeed)
+
+    DataManager.saveDataToBinaryFile(pDataQueue, strTopologyPath, strTag)
+    hshEntry = {
+        'topology':        strTopologyPath,
+        'tag':             strTag,
+        'missionMinutes':  nMissionMinutes,
+        'factor':          nFactor,
+        'totalReceivers':  nTotalReceivers,
+        'seed':            nSeed,
+        'hosts':           len(lstHostNames),
+        'packages':        len(pDataQueue),
+        'payloadSizes':    pDataQueue.getPayloadSizes(),
+        'binaryFile':      DataManager.binaryFileNameForFromTopo(strTopologyPath, strTag),
+        'textFile':        None,
+    }
+    if (bSaveText):
+        DataManager.saveDataToTextFile(pDataQueue, strTopologyPath, strTag)
+        hshEntry['textFile'] = DataManager.textFileNameForFromTopo(strTopologyPath, strTag)
+
+    hshEntry['seconds'] = round(time.time() - sStart, 3)
+    return hshEntry
+
+def parseList(strValues, fnType):
+    """
+    Parses a comma separated list of values
+    """
+    return [fnType(strValue) for strValue in strValues.split(',') if (strValue.strip() != '')]
+
+def parseFactor(strValue):
+    sFactor = float(strValue)
+    return int(sFactor) if (sFactor.is_integer()) else sFactor
+
+def showHelp():
+    strHelp  =  'Help: -----------------------------------------------\n'
+    strHelp += 'generate_queue_sweep.py - generates data queues for a grid of scenarios\n\n'
+    strHelp += 'Usage:\n'
+    strHelp += './generate_queue_sweep.py -t <topo1.conf,topo2.conf,...> <options>\n'
+    strHelp += 'Options can be, in any order:\n'
+    strHelp += '  --minutes <m1,m2,...>:   mission lengths in minutes, default 40\n'
+    strHelp += '  --factors <f1,f2,...>:   DataManager nFactor values, default 2\n'
+    strHelp += '  --receivers <r1,r2,...>: number of receivers for type 7, default 2\n'
+    strHelp += '  --seed <n>:              seed used by every scenario\n'
+    strHelp += '  --workers <n>:           number of processes, default is the number of cores\n'
+    strHelp += '  --text:                  also saves the text queue files\n'
+    strHelp += '  --manifest <path>:       manifest file, default %s\n' % c_strManifestFile
+    print(strHelp)
+
+def main():
+    """
+    Generates one queue per scenario, queue_<topo>_<tag>.bin in the same directory as each topology file,
+    and writes the manifest listing all of them.
+    """
+    lstTopologies   = []
+    lstMinutes      = [40]
+    lstFactors      = [2]
+    lstReceivers    = [2]
+    nSeed           = None
+    nWorkers        = cpu_count() or 1
+    bSaveText       = False
+    strManifestPath = c_strManifestFile
+
+    short_options = 'ht:'
+    long_options  = ['help', 'topologies=', 'minutes=', 'factors=', 'receivers=', 'seed=', 'workers=', 'text', 'manifest=']
+    opts, args = getopt.getopt(sys.argv[1:], short_options, long_options)
+    for opt, arg in opts:
+        if opt in ['-h', '--help']:
+            showHelp()
+            exit(0)
+        elif opt in ['-t', '--topologies']:
+            lstTopologies = parseList(arg, str)
+        elif opt == '--minutes':
+            lstMinutes = parseList(arg, int)
+        elif opt == '--factors':
+            lstFactors = parseList(arg, parseFactor)
+        elif opt == '--receivers':
+            lstReceivers = parseList(arg, int)
+        elif opt == '--seed':
+            nSeed = int(arg)
+        elif opt == '--workers':
+            nWorkers = int(arg)
+        elif opt == '--text':
+            bSaveText = True
+        elif opt == '--manifest':
+            strManifestPath = arg
+
+    if (len(lstTopologies) == 0):
+        logging.error('[main] No topology file specified!')
+        showHelp()
+        exit(0)
+
+    # Each topology file is parsed only once and its host list shared by all of its scenarios
+    hshHostNames = {}
+    for strTopologyPath in lstTopologies:
+        if (strTopologyPath not in hshHostNames):
+            hshHostNames[strTopologyPath] = readHostNamesFromTopoFile(strTopologyPath)
+
+    lstScenarios = list(product(hshHostNames.keys(), lstMinutes, lstFactors, lstReceivers))
+    logging.info('[main] Generating %d scenarios with %d workers, topologies=%s, minutes=%s, factors=%s, receivers=%s, seed=%s' %
+        (len(lstScenarios), nWorkers, list(hshHostNames.keys()), lstMinutes, lstFactors, lstReceivers, nSeed))
+
+    sStart = time.time()
+    lstEntries = list()
+    with ProcessPoolExecutor(max_workers=nWorkers) as pPool:
+        lstFutures = list()
+        for (strTopologyPath, nMissionMinutes, nFactor, nTotalReceivers) in lstScenarios:
+            lstFutures.append(pPool.submit(generateScenario, strTopologyPath, hshHostNames[strTopologyPath], nMissionMinutes,
+                nFactor, nTotalReceivers, nSeed, bSaveText))
+        for pFuture in lstFutures:
+            hshEntry = pFuture.result()
+            logging.info('[main] Scenario topology=%s, tag=%s, packages=%d, seconds=%.2f' %
+                (hshEntry['topology'], hshEntry['tag'], hshEntry['packages'], hshEntry['seconds']))
+            lstEntries.append(hshEntry)
+
+    hshManifest = {'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'seed': nSeed, 'scenarios': lstEntries}
+    with open(strManifestPath, 'w') as pFile:
+        json.dump(hshManifest, pFile, indent=2)
+
+    logging.info('[main] Done! %d scenarios in %.2f seconds, manifest=%s' % (len(lstEntries), time.time() - sStart, strManifestPath))
+
+if __name__ == '__main__':
+    main()
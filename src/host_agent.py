@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+"""
+Long lived agent started once inside each Mininet host. Reads one JSON command per
+line from stdin and starts ndnputchunks/ndncatchunks without a shell, so the runner
+does not pay for a popen, mnexec and shell startup for every interest.
+
+Commands and replies, one JSON object per line:
+    {"id": n, "op": "serve", "name": <prefix>, "ttl": <ms>, "file": <path>}  ->  {"id": n, "pid": <pid>}
+    {"id": n, "op": "fetch", "name": <interest>}                            ->  {"id": n, "pid": <pid>}
+    {"id": n, "op": "kill", "pid": <pid>}                                   ->  {"id": n, "pid": <pid>}
+    {"id": n, "op": "ping"}                                                 ->  {"id": n, "pid": <agent pid>}
+    {"id": n, "op": "quit"}                                                 ->  {"id": n, "pid": <agent pid>}
+Errors are returned as {"id": n, "error": <message>}.
+
+Created 18/10/2026
+"""
+import os
+import sys
+import json
+import signal
+import subprocess
+
+# ---------------------------------------- Constants
+c_strProducerCmd = 'ndnputchunks'
+c_strConsumerCmd = 'ndncatchunks'
+
+def reapChildren(hshChildren):
+    """
+    Collects the exit status of finished children so they do not stay as zombies
+    """
+    for nPid in list(hshChildren.keys()):
+        if (hshChildren[nPid].poll() is not None):
+            del hshChildren[nPid]
+
+def handleCommand(hshCommand, hshChildren):
+    """
+    Runs one command, returns the reply dictionary
+    """
+    strOp = hshCommand.get('op')
+    if (strOp == 'serve'):
+        with open(hshCommand['file'], 'rb') as pPayload:
+            proc = subprocess.Popen([c_strProducerCmd, hshCommand['name'], '-f', str(int(hshCommand['ttl'])), '-q'],
+                stdin=pPayload, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        hshChildren[proc.pid] = proc
+        return {'pid': proc.pid}
+    elif (strOp == 'fetch'):
+        proc = subprocess.Popen([c_strConsumerCmd, hshCommand['name'], '-q'], stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        hshChildren[proc.pid] = proc
+        return {'pid': proc.pid}
+    elif (strOp == 'kill'):
+        nPid = int(hshCommand['pid'])
+        try:
+            os.kill(nPid, int(hshCommand.get('sig', signal.SIGKILL)))
+        except ProcessLookupError:
+            # Already finished
+            pass
+        return {'pid': nPid}
+    elif (strOp in ('ping', 'quit')):
+        return {'pid': os.getpid()}
+    raise Exception('Unknown op=%s' % strOp)
+
+def main():
+    hshChildren = {}
+    for strLine in sys.stdin:
+        if (strLine.strip() == ''):
+            continue
+        hshReply = {'id': None}
+        try:
+            hshCommand = json.loads(strLine)
+            hshReply['id'] = hshCommand.get('id')
+            hshReply.update(handleCommand(hshCommand, hshChildren))
+        except Exception as e:
+            hshReply['error'] = '%s: %s' % (type(e).__name__, str(e))
+
+        sys.stdout.write(json.dumps(hshReply) + '\n')
+        sys.stdout.flush()
+        reapChildren(hshChildren)
+
+        if (hshReply.get('error') is None) and (hshCommand.get('op') == 'quit'):
+            break
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,3 @@
 from .data_manager import DataManager
+from .data_queue import DataQueue, DataQueueBuilder
 from .generics import *
\ No newline at end of file
@@ -6,6 +6,8 @@ Created 14/10/2020 by Andre Dexheimer Carneiro
 import random
 import logging
 
+import numpy as np
+
 from .data_package import DataPackage
 
 class C2DataType:
@@ -66,6 +68,47 @@ class C2DataType:
 
         return nCount
 
+    def generateDataArrays(self, strHost, nMissionMinutes, lstHosts, pRng, nFirstID=None):
+        """
+        Vectorized version of generateDataQueue, every (period, receiver) timestamp is drawn at once from the
+        numpy.random.Generator pRng. Returns the tuple (arrTimeMs, arrID, arrCons) sorted by time,
+        where arrCons holds indexes into lstHosts.
+        IDs start at nFirstID if given, otherwise at nCurID, which is then advanced.
+        """
+        lstPossibleReceivers = self.generatePossibleReceiversList(strHost, lstHosts)
+        hshHostIndex = {strNode: nIndex for (nIndex, strNode) in enumerate(lstHosts)}
+        arrPossibleReceivers = np.array([hshHostIndex[strNode] for strNode in lstPossibleReceivers], dtype=np.int32)
+
+        # One row per period, same periods as the while loop in generateDataQueue
+        nPeriods = self.periodsForMission(nMissionMinutes)
+        if (self.nType == 7):
+            # Same draw as getNDestHosts
+            logging.info('[C2DataType.generateDataArrays] Type 7, using %d total receivers' % self.nTotalReceivers)
+            arrChoice = pRng.integers(0, len(arrPossibleReceivers)-1, size=(nPeriods, self.nTotalReceivers))
+            arrCons   = arrPossibleReceivers[arrChoice]
+        else:
+            arrCons = np.broadcast_to(arrPossibleReceivers, (nPeriods, len(arrPossibleReceivers)))
+
+        # Send offset inside each period with sPeriodWiggleRoom jitter, same bounds as getAllDestHosts
+        nPeriodMs  = self.nPeriodSec*1000
+        arrJitter  = pRng.integers(int(nPeriodMs - nPeriodMs*self.sPeriodWiggleRoom), int(nPeriodMs + nPeriodMs*self.sPeriodWiggleRoom), size=arrCons.shape, endpoint=True)
+        arrStartMs = np.arange(nPeriods) * nPeriodMs
+        arrTimeMs  = (arrStartMs[:, np.newaxis] + arrJitter).astype(np.int64).ravel()
+        if (nFirstID is None):
+            nFirstID     = self.nCurID
+            self.nCurID += nPeriods
+        arrID   = np.repeat(np.arange(nFirstID, nFirstID + nPeriods, dtype=np.int64), arrCons.shape[1])
+        arrCons = arrCons.ravel()
+
+        arrOrder = np.argsort(arrTimeMs, kind='stable')
+        return (arrTimeMs[arrOrder], arrID[arrOrder], arrCons[arrOrder])
+
+    def periodsForMission(self, nMissionMinutes):
+        """
+        Returns the number of periods, and so of package IDs, a host generates during the mission
+        """
+        return int((nMissionMinutes * 60) // self.nPeriodSec) + 1
+
     def generateSpreadDataQueue(self, strHost, nMissionMinutes, lstDataQueue, lstHosts):
         """
         Creates a a data queue of a single package to be sent to all hosts.
@@ -4,25 +4,33 @@ package queues.
 
 Created 25/09/2020 by Andre Dexheimer Carneiro
 """
+import heapq
 import logging
 import pickle
-import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from os.path import dirname, basename, isfile
 
+import numpy as np
+
 from .c2_datatype import C2DataType, DataPackage
+from .data_queue import DataQueue, DataQueueBuilder
+from .queue_file import writeQueueFile, readQueueFile, iterQueueFile
+from .payload_pool import PayloadPool, nameForPayloadFile
 
 # Constants --------------------------------
 c_strTopoFileSuffix = '.conf'
+c_nStreamLookAhead  = 4096
+c_hshHostTypeNames  = {'d': 'drone', 'h': 'human', 's': 'sensor', 'v': 'vehicle'}
 
 
 class DataManager:
 
-    def __init__(self, nTotalReceivers=1):
+    def __init__(self, nTotalReceivers=1, nFactor=2):
         """
-        Constructor
+        Constructor. nFactor divides the TTL and period of the data types, higher values produce more packages.
         """
         self.lstDataTypes = []
-        nFactor           = 2
+        self.nFactor      = nFactor
         # Initialize known dataTypes
         ################################################
         # Control data
@@ -66,78 +74,109 @@ class DataManager:
         """
         Generates an unordered queue with packages and send time
         """
-        lstDataQueue = []
+        pQueueBuilder = DataQueueBuilder()
         for strHost in lstHosts:
             # Generate data from each host
             if(strHost[0] == 'd'):
                 # Drone
                 logging.info('[generateDataQueue] Node type drone, strHost=%s' % (strHost))
-                self.lstDataTypes[6].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
+                self.lstDataTypes[6].generateDataQueue(strHost, nMissionMinutes, pQueueBuilder, lstHosts)
             elif(strHost[0] == 'h'):
                 # Human
                 logging.info('[generateDataQueue] Node type human, strHost=%s' % (strHost))
-                self.lstDataTypes[6].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
+                self.lstDataTypes[6].generateDataQueue(strHost, nMissionMinutes, pQueueBuilder, lstHosts)
             elif(strHost[0] == 's'):
                 # Sensor
                 logging.info('[generateDataQueue] Node type sensor, strHost=%s' % (strHost))
-                self.lstDataTypes[6].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
+                self.lstDataTypes[6].generateDataQueue(strHost, nMissionMinutes, pQueueBuilder, lstHosts)
             elif(strHost[0] == 'v'):
                 # Vehicle
                 logging.info('[generateDataQueue] Node type vehicle, strHost=%s' % (strHost))
-                self.lstDataTypes[6].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
+                self.lstDataTypes[6].generateDataQueue(strHost, nMissionMinutes, pQueueBuilder, lstHosts)
             else:
                 # Unrecognized host type
                 logging.error('[generateDataQueue] Unrecognized host type ' + strHost)
 
-        lstDataQueue.sort(key=lambda x: x[0])
-        return lstDataQueue
+        return pQueueBuilder.build()
 
     def generateDataQueue(self, lstHosts, nMissionMinutes):
         """
-        Generates an unordered queue with packages and send time
+        Generates a DataQueue with packages and send time, ordered by send time
         """
-        lstDataQueue = []
+        pQueueBuilder = DataQueueBuilder()
         for strHost in lstHosts:
             # Generate data from each host
-            if(strHost[0] == 'd'):
-                # Drone
-                logging.info('[generateDataQueue] Node type drone, strHost=%s' % (strHost))
-                self.lstDataTypes[0].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[1].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[2].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[3].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[4].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[5].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-            elif(strHost[0] == 'h'):
-                # Human
-                logging.info('[generateDataQueue] Node type human, strHost=%s' % (strHost))
-                self.lstDataTypes[0].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[1].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[2].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[3].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[4].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[5].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-            elif(strHost[0] == 's'):
-                # Sensor
-                logging.info('[generateDataQueue] Node type sensor, strHost=%s' % (strHost))
-                self.lstDataTypes[0].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[1].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[2].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-            elif(strHost[0] == 'v'):
-                # Vehicle
-                logging.info('[generateDataQueue] Node type vehicle, strHost=%s' % (strHost))
-                self.lstDataTypes[0].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[1].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[2].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[3].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[4].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-                self.lstDataTypes[5].generateDataQueue(strHost, nMissionMinutes, lstDataQueue, lstHosts)
-            else:
+            lstHostDataTypes = self.getDataTypesForHost(strHost)
+            if (lstHostDataTypes is None):
                 # Unrecognized host type
                 logging.error('[generateDataQueue] Unrecognized host type ' + strHost)
+                continue
+
+            logging.info('[generateDataQueue] Node type %s, strHost=%s' % (c_hshHostTypeNames[strHost[0]], strHost))
+            for pDataType in lstHostDataTypes:
+                pDataType.generateDataQueue(strHost, nMissionMinutes, pQueueBuilder, lstHosts)
+
+        return pQueueBuilder.build()
+
+    def generateVectorDataQueue(self, lstHosts, nMissionMinutes, nSeed=None, nWorkers=1):
+        """
+        Vectorized generateDataQueue. Each host and data type produces a time sorted run of events, runs are then
+        combined with a k-way merge.
+        Every host draws from its own numpy.random.Generator, spawned from a master seed sequence built with nSeed,
+        and package IDs are assigned before generation. With nWorkers > 1 hosts are sharded across a process pool;
+        the result is the same for any number of workers.
+        """
+        pMasterSeed  = np.random.SeedSequence(nSeed)
+        lstHostSeeds = pMasterSeed.spawn(len(lstHosts))
+
+        # Assign the first package ID of every (host, data type) in host order, as the serial generator would
+        lstTasks = list()
+        for (nHostIndex, strHost) in enumerate(lstHosts):
+            lstHostDataTypes = self.getDataTypesForHost(strHost)
+            if (lstHostDataTypes is None):
+                logging.error('[generateVectorDataQueue] Unrecognized host type ' + strHost)
+                continue
+
+            lstFirstIDs = list()
+            for pDataType in lstHostDataTypes:
+                lstFirstIDs.append(pDataType.nCurID)
+                pDataType.nCurID += pDataType.periodsForMission(nMissionMinutes)
+            lstTasks.append((lstHostDataTypes, nHostIndex, lstFirstIDs))
+
+        lstHostRuns = list()
+        if (nWorkers > 1):
+            nChunkSize = max(1, len(lstTasks) // (nWorkers*4))
+            (lstDataTypes, lstHostIndexes, lstFirstIDs) = zip(*lstTasks)
+            with ProcessPoolExecutor(max_workers=nWorkers) as pPool:
+                lstHostRuns = list(pPool.map(generateHostRuns, lstDataTypes, lstHostIndexes, lstFirstIDs,
+                    [lstHostSeeds[nHostIndex] for nHostIndex in lstHostIndexes], [nMissionMinutes]*len(lstTasks),
+                    [lstHosts]*len(lstTasks), chunksize=nChunkSize))
+        else:
+            for (lstHostDataTypes, nHostIndex, lstFirstIDs) in lstTasks:
+                lstHostRuns.append(generateHostRuns(lstHostDataTypes, nHostIndex, lstFirstIDs, lstHostSeeds[nHostIndex], nMissionMinutes, lstHosts))
 
-        lstDataQueue.sort(key=lambda x: x[0])
-        return lstDataQueue
+        # Runs keep host order regardless of which worker created them
+        lstRuns = list()
+        for lstColumns in lstHostRuns:
+            for tplColumns in lstColumns:
+                lstRuns.append(DataQueue(*tplColumns, lstHostNames=lstHosts))
+
+        pDataQueue = DataQueue.mergeSorted(lstRuns, lstHosts)
+        logging.info('[generateVectorDataQueue] Generated %d packages from %d runs, seed=%s, entropy=%s, workers=%d' %
+            (len(pDataQueue), len(lstRuns), nSeed, pMasterSeed.entropy, nWorkers))
+        return pDataQueue
+
+    def getDataTypesForHost(self, strHost):
+        """
+        Returns the list of data types produced by a host based on the first letter of its name, None if the type is unknown.
+        Drones, humans and vehicles produce types 1 to 6, sensors only 1 to 3.
+        """
+        if (strHost[0] in ['d', 'h', 'v']):
+            return self.lstDataTypes[0:6]
+        elif (strHost[0] == 's'):
+            return self.lstDataTypes[0:3]
+        else:
+            return None
 
     def getTTLValuesParam(self):
         """
@@ -156,6 +195,12 @@ class DataManager:
                 return pDataType.nTTL
         raise Exception('Data type=%d does not exist' % nType)
 
+    def getPayloadSizes(self):
+        """
+        Returns a list with the payload sizes of all available data types
+        """
+        return [pDataType.nPayloadSize for pDataType in self.lstDataTypes]
+
     def getPayloadValuesParam(self):
         """
         Returns a string listing the payload values for all available data types
@@ -170,20 +215,23 @@ class DataManager:
     @staticmethod
     def createPayloadFiles(lstData, strBasePath):
         lstPayloads = DataManager.getPayloadSizesFromQueue(lstData)
-        nFilesCreated = 0
-        subprocess.Popen('mkdir -p %s' % strBasePath, shell=True)
-        for nPayloadSize in lstPayloads:
-            strFileName = DataManager.nameForPayloadFile(nPayloadSize, strBasePath)
-            if (not isfile(strFileName)):
-                strCmd = 'base64 /dev/urandom | head -c %d > %s' % (nPayloadSize, strFileName)
-                subprocess.Popen(strCmd, shell=True)
-                nFilesCreated += 1
-                logging.info('[DataManager.createPayloadFiles] Created file with cmd=%s' % strCmd.split(' '))
+        DataManager.createPayloadFilesForSizes(lstPayloads, strBasePath)
+
+    @staticmethod
+    def createPayloadFilesForSizes(lstPayloads, strBasePath, bUseTmpfs=False, strLargeBackend='pattern'):
+        """
+        Creates the payload files through a PayloadPool, returns only when all files are ready.
+        Returns the directory holding the files, which is under /dev/shm if bUseTmpfs is set.
+        strLargeBackend sets how files of 1 MiB or more are created, see PayloadPool.
+        """
+        pPool = PayloadPool(strBasePath, bUseTmpfs, strLargeBackend)
+        nFilesCreated = pPool.prepare(lstPayloads)
         logging.info('[DataManager.createPayloadFiles] Created %d files' % nFilesCreated)
+        return pPool.strBasePath
 
     @staticmethod
     def nameForPayloadFile(nPayloadSize, strBasePath):
-        return strBasePath + '/' + 'file_' + str(int(nPayloadSize/1024)) + 'K'
+        return nameForPayloadFile(nPayloadSize, strBasePath)
 
     @staticmethod
     def saveDataQueueToFile(lstQueue, strTopoFilePath):
@@ -211,28 +259,72 @@ class DataManager:
         return lstQueue
 
     @staticmethod
-    def loadDataQueueFromTextFile(strTopoFilePath):
+    def loadDataQueueFromTextFile(strTopoFilePath, strTag=''):
         """
         Loads data queue from txt file.
         """
-        strPath  = DataManager.textFileNameForFromTopo(strTopoFilePath)
-        lstData = list()
+        strPath  = DataManager.textFileNameForFromTopo(strTopoFilePath, strTag)
+        pBuilder = DataQueueBuilder()
         with open(strPath, 'r') as pFile:
-            lstLines = pFile.readlines()
-            for strLine in lstLines:
+            for strLine in pFile:
                 if (strLine.strip() != ''):
                     lstFields = strLine.split(';', 1)
                     nTimeMs = int(lstFields[0])
-                    pPackage = DataPackage.fromTextLine(lstFields[1])
-                    lstData.append([nTimeMs, pPackage])
-        return lstData
+                    (nType, nID, nPayloadSize, strHost, strDest) = DataPackage.fieldsFromTextLine(lstFields[1])
+                    pBuilder.addEvent(nTimeMs, nType, nID, nPayloadSize, strHost, strDest)
+        return pBuilder.build()
+
+    @staticmethod
+    def streamDataQueue(strTopoFilePath, nLookAhead=c_nStreamLookAhead, strTag='', nStartMs=None, nEndMs=None):
+        """
+        Returns a generator of time ordered (nTimeMs, DataPackage) tuples read lazily from the queue file.
+        The binary file is used if it exists, otherwise the text file. At most nLookAhead events are buffered.
+        Only events sent in [nStartMs, nEndMs) are returned, the binary file seeks directly to nStartMs.
+        """
+        strPath = DataManager.binaryFileNameForFromTopo(strTopoFilePath, strTag)
+        if (isfile(strPath)):
+            logging.info('[DataManager.streamDataQueue] Streaming binary queue from path=%s, startMs=%s, endMs=%s' % (strPath, nStartMs, nEndMs))
+            return iterQueueFile(strPath, nLookAhead, nStartMs, nEndMs)
+        return DataManager.streamDataQueueFromTextFile(strTopoFilePath, nLookAhead, strTag, nStartMs, nEndMs)
+
+    @staticmethod
+    def streamDataQueueFromTextFile(strTopoFilePath, nLookAhead=c_nStreamLookAhead, strTag='', nStartMs=None, nEndMs=None):
+        """
+        Yields (nTimeMs, DataPackage) tuples read lazily from the text file.
+        Events are reordered within a window of nLookAhead lines, which is enough for files written by saveDataToTextFile.
+        Text files have no time index, lines before nStartMs are read and skipped.
+        """
+        strPath = DataManager.textFileNameForFromTopo(strTopoFilePath, strTag)
+        logging.info('[DataManager.streamDataQueueFromTextFile] Streaming text queue from path=%s' % strPath)
+        lstHeap = []
+        nLine   = 0
+        with open(strPath, 'r') as pFile:
+            for strLine in pFile:
+                if (strLine.strip() != ''):
+                    lstFields = strLine.split(';', 1)
+                    # The line number keeps events with the same timestamp in file order
+                    heapq.heappush(lstHeap, (int(lstFields[0]), nLine, lstFields[1]))
+                    nLine += 1
+                    if (len(lstHeap) > nLookAhead):
+                        (nTimeMs, nLineIndex, strPackage) = heapq.heappop(lstHeap)
+                        if (nEndMs is not None) and (nTimeMs >= nEndMs):
+                            return
+                        if (nStartMs is None) or (nTimeMs >= nStartMs):
+                            yield (nTimeMs, DataPackage.fromTextLine(strPackage))
+
+        while (len(lstHeap) > 0):
+            (nTimeMs, nLineIndex, strPackage) = heapq.heappop(lstHeap)
+            if (nEndMs is not None) and (nTimeMs >= nEndMs):
+                return
+            if (nStartMs is None) or (nTimeMs >= nStartMs):
+                yield (nTimeMs, DataPackage.fromTextLine(strPackage))
 
     @staticmethod
-    def saveDataToTextFile(lstData, strTopoFilePath):
+    def saveDataToTextFile(lstData, strTopoFilePath, strTag=''):
         """
         Saves the data queue into a text file
         """
-        strPath  = DataManager.textFileNameForFromTopo(strTopoFilePath)
+        strPath  = DataManager.textFileNameForFromTopo(strTopoFilePath, strTag)
         pFile = open(strPath, 'w')
         if (not pFile):
             logging.error('[DataManager.saveDataToTextFile] Error opening output file=%s' % strPath)
@@ -245,42 +337,89 @@ class DataManager:
         logging.info('[DataManager.saveDataToTextFile] Saved %d packages' % len(lstData))
         pFile.close()
 
+    @staticmethod
+    def saveDataToBinaryFile(lstData, strTopoFilePath, strTag=''):
+        """
+        Saves the data queue into a binary queue file
+        """
+        strPath = DataManager.binaryFileNameForFromTopo(strTopoFilePath, strTag)
+        writeQueueFile(DataQueue.toDataQueue(lstData), strPath)
+        return True
+
+    @staticmethod
+    def loadDataQueueFromBinaryFile(strTopoFilePath, strTag=''):
+        """
+        Loads the data queue from a binary queue file, records are memory mapped and not read upfront
+        """
+        strPath = DataManager.binaryFileNameForFromTopo(strTopoFilePath, strTag)
+        return readQueueFile(strPath)
+
+    @staticmethod
+    def loadDataQueue(strTopoFilePath, strTag=''):
+        """
+        Loads the data queue from the binary file if it exists, otherwise from the text file.
+        """
+        if (isfile(DataManager.binaryFileNameForFromTopo(strTopoFilePath, strTag))):
+            return DataManager.loadDataQueueFromBinaryFile(strTopoFilePath, strTag)
+        logging.info('[DataManager.loadDataQueue] No binary queue for topo=%s, reading text file' % strTopoFilePath)
+        return DataManager.loadDataQueueFromTextFile(strTopoFilePath, strTag)
+
     @staticmethod
     def pickleFileNameForFromTopo(strTopoFilePath):
         """
         Returns the designated pickle file path
         """
-        strTopoName = basename(strTopoFilePath)
-        if (strTopoName.endswith('.conf')):
-            strTopoName = strTopoName[:-5]
+        return DataManager.queueFileNameForFromTopo(strTopoFilePath, '.pkl')
 
-        strDirName = dirname(strTopoFilePath)
-        if (strDirName != '') and (strDirName[-1] != '/'):
-            strDirName += '/'
+    @staticmethod
+    def textFileNameForFromTopo(strTopoFilePath, strTag=''):
+        """
+        Returns the designated text file path
+        """
+        return DataManager.queueFileNameForFromTopo(strTopoFilePath, '.txt', strTag)
 
-        strPath = strDirName + 'queue_' + strTopoName + '.pkl'
-        return strPath
+    @staticmethod
+    def binaryFileNameForFromTopo(strTopoFilePath, strTag=''):
+        """
+        Returns the designated binary file path
+        """
+        return DataManager.queueFileNameForFromTopo(strTopoFilePath, '.bin', strTag)
 
     @staticmethod
-    def textFileNameForFromTopo(strTopoFilePath):
+    def queueFileNameForFromTopo(strTopoFilePath, strExtension, strTag=''):
         """
-        Returns the designated text file path
+        Returns the path queue_<topo>[_<strTag>]<strExtension> in the same directory as the topology file.
+        Tags tell apart queues generated with different parameters for the same topology.
         """
         strTopoName = basename(strTopoFilePath)
-        if (strTopoName.endswith('.conf')):
-            strTopoName = strTopoName[:-5]
+        if (strTopoName.endswith(c_strTopoFileSuffix)):
+            strTopoName = strTopoName[:-len(c_strTopoFileSuffix)]
 
         strDirName = dirname(strTopoFilePath)
         if (strDirName != '') and (strDirName[-1] != '/'):
             strDirName += '/'
 
-        strPath = strDirName + 'queue_' + strTopoName + '.txt'
+        if (strTag != ''):
+            strTopoName += '_' + strTag
+
+        strPath = strDirName + 'queue_' + strTopoName + strExtension
         return strPath
 
     @staticmethod
     def getPayloadSizesFromQueue(lstData):
-        lstPayloads = list()
-        for (nTimestamp, pPackage) in lstData:
-            if (pPackage.nPayloadSize not in lstPayloads):
-                lstPayloads.append(pPackage.nPayloadSize)
-        return lstPayloads
\ No newline at end of file
+        return DataQueue.toDataQueue(lstData).getPayloadSizes()
+
+
+def generateHostRuns(lstHostDataTypes, nHostIndex, lstFirstIDs, pSeedSequence, nMissionMinutes, lstHosts):
+    """
+    Generates the runs for one host, one per data type. Module level so it can be sent to worker processes.
+    Returns a list of (arrTimeMs, arrType, arrID, arrPayload, arrProd, arrCons) tuples.
+    """
+    pRng    = np.random.default_rng(pSeedSequence)
+    strHost = lstHosts[nHostIndex]
+    lstRuns = list()
+    for (pDataType, nFirstID) in zip(lstHostDataTypes, lstFirstIDs):
+        (arrTimeMs, arrID, arrCons) = pDataType.generateDataArrays(strHost, nMissionMinutes, lstHosts, pRng, nFirstID)
+        nEvents = len(arrTimeMs)
+        lstRuns.append((arrTimeMs, np.full(nEvents, pDataType.nType), arrID, np.full(nEvents, pDataType.nPayloadSize), np.full(nEvents, nHostIndex), arrCons))
+    return lstRuns
@@ -4,11 +4,16 @@ Data Package
 Created 14/10/2020 by Andre Dexheimer Carneiro
 """
 
+from icnexperiment.generics import g_pHostTable
+
 # ---------------------------------------- Constants
 c_strAppName = 'C2Data'
 
 class DataPackage:
 
+    # Origin and destination are kept as ids in g_pHostTable
+    __slots__ = ('nType', 'nID', 'nPayloadSize', 'nOrig', 'nDest')
+
     def __init__(self, nType, nID, nPayloadSize, strHost, strDest):
         """
         Constructor
@@ -16,8 +21,8 @@ class DataPackage:
         self.nID          = nID
         self.nPayloadSize = nPayloadSize
         self.nType        = nType
-        self.strOrig      = strHost
-        self.strDest      = strDest
+        self.nOrig        = g_pHostTable.intern(strHost)
+        self.nDest        = g_pHostTable.intern(strDest)
 
     def __repr__(self):
         """
@@ -25,6 +30,18 @@ class DataPackage:
         """
         return '<DataPackage_Type%s_ID%s (%s -> %s)>' %(self.nType, self.nID, self.strOrig, self.strDest)
 
+    def __reduce__(self):
+        # Ids are only valid in the process that created them, names are pickled instead
+        return (DataPackage, (self.nType, self.nID, self.nPayloadSize, self.strOrig, self.strDest))
+
+    @property
+    def strOrig(self):
+        return g_pHostTable.lstNames[self.nOrig]
+
+    @property
+    def strDest(self):
+        return g_pHostTable.lstNames[self.nDest]
+
     def getInterest(self):
         """
         Returns the string representation of the interest filter
@@ -46,13 +63,34 @@ class DataPackage:
     def toTextLine(self):
         return 'Type=%d;Id=%d;Payload=%d;Prod=%s;Cons=%s' % (self.nType, self.nID, self.nPayloadSize, self.strOrig, self.strDest)
 
+    @staticmethod
+    def fromIds(nType, nID, nPayloadSize, nOrig, nDest):
+        """
+        Creates a DataPackage from host ids already interned in g_pHostTable
+        """
+        pPackage = DataPackage.__new__(DataPackage)
+        pPackage.nType        = nType
+        pPackage.nID          = nID
+        pPackage.nPayloadSize = nPayloadSize
+        pPackage.nOrig        = nOrig
+        pPackage.nDest        = nDest
+        return pPackage
+
     @staticmethod
     def fromTextLine(strLine):
+        (nType, nID, nPayloadSize, strHost, strDest) = DataPackage.fieldsFromTextLine(strLine)
+        return DataPackage(nType, nID, nPayloadSize, strHost, strDest)
+
+    @staticmethod
+    def fieldsFromTextLine(strLine):
+        """
+        Returns the tuple (nType, nID, nPayloadSize, strHost, strDest) read from a text line
+        """
         lstFields = strLine.split(';')
         nType = int(lstFields[0].split('=')[1])
         nID = int(lstFields[1].split('=')[1])
         nPayloadSize = int(lstFields[2].split('=')[1])
         strHost = lstFields[3].split('=')[1].strip()
         strDest = lstFields[4].split('=')[1].strip()
-        return DataPackage(nType, nID, nPayloadSize, strHost, strDest)
+        return (nType, nID, nPayloadSize, strHost, strDest)
 
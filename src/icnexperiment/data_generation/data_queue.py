@@ -0,0 +1,254 @@
+"""
+Columnar data queue.
+
+Holds the events created by DataManager as parallel typed arrays instead of
+a list of [nTimeMs, DataPackage] pairs. Producer and consumer names are
+interned as indexes into a single host name list.
+
+Created 18/10/2026
+"""
+import array
+import logging
+
+import numpy as np
+
+from .data_package import DataPackage
+from icnexperiment.generics import g_pHostTable
+
+# Column types ----------------------------
+c_dtTimeMs  = np.int64
+c_dtType    = np.int32
+c_dtID      = np.int64
+c_dtPayload = np.int64
+c_dtHost    = np.int32
+
+
+class DataQueue:
+
+    def __init__(self, arrTimeMs, arrType, arrID, arrPayload, arrProd, arrCons, lstHostNames):
+        """
+        Constructor. All arrays must have the same length, arrProd and arrCons hold
+        indexes into lstHostNames.
+        """
+        self.arrTimeMs    = np.asarray(arrTimeMs, dtype=c_dtTimeMs)
+        self.arrType      = np.asarray(arrType, dtype=c_dtType)
+        self.arrID        = np.asarray(arrID, dtype=c_dtID)
+        self.arrPayload   = np.asarray(arrPayload, dtype=c_dtPayload)
+        self.arrProd      = np.asarray(arrProd, dtype=c_dtHost)
+        self.arrCons      = np.asarray(arrCons, dtype=c_dtHost)
+        self.lstHostNames = list(lstHostNames)
+        self.hshHostIndex = {strHost: nIndex for (nIndex, strHost) in enumerate(self.lstHostNames)}
+        # Ids of the hosts in g_pHostTable, used to create packages without looking up names
+        self.lstHostIds   = g_pHostTable.internAll(self.lstHostNames)
+
+        nLen = len(self.arrTimeMs)
+        for arrColumn in (self.arrType, self.arrID, self.arrPayload, self.arrProd, self.arrCons):
+            if (len(arrColumn) != nLen):
+                raise Exception('[DataQueue.__init__] Column length mismatch, expected=%d, got=%d' % (nLen, len(arrColumn)))
+
+    def __len__(self):
+        return len(self.arrTimeMs)
+
+    def __repr__(self):
+        return '<DataQueue len=%d, hosts=%d>' % (len(self), len(self.lstHostNames))
+
+    def __getitem__(self, index):
+        """
+        Integer indexes return a (nTimeMs, DataPackage) tuple, the same shape as the old
+        list entries. Slices return a new DataQueue sharing the same arrays.
+        """
+        if (isinstance(index, slice)):
+            return DataQueue(self.arrTimeMs[index], self.arrType[index], self.arrID[index], self.arrPayload[index],
+                self.arrProd[index], self.arrCons[index], self.lstHostNames)
+        return (self.timestampAt(index), self.getPackage(index))
+
+    def __iter__(self):
+        """
+        Yields (nTimeMs, DataPackage) tuples, packages are only created as they are visited.
+        """
+        nBlock = 4096
+        for nBegin in range(0, len(self), nBlock):
+            nEnd = nBegin + nBlock
+            lstTimes   = self.arrTimeMs[nBegin:nEnd].tolist()
+            lstTypes   = self.arrType[nBegin:nEnd].tolist()
+            lstIDs     = self.arrID[nBegin:nEnd].tolist()
+            lstPayload = self.arrPayload[nBegin:nEnd].tolist()
+            lstProd    = self.arrProd[nBegin:nEnd].tolist()
+            lstCons    = self.arrCons[nBegin:nEnd].tolist()
+            for i in range(len(lstTimes)):
+                pPackage = DataPackage.fromIds(lstTypes[i], lstIDs[i], lstPayload[i], self.lstHostIds[lstProd[i]], self.lstHostIds[lstCons[i]])
+                yield (lstTimes[i], pPackage)
+
+    def timestampAt(self, nIndex):
+        """
+        Returns the send timestamp in ms of the event at nIndex
+        """
+        return int(self.arrTimeMs[nIndex])
+
+    def indexForTime(self, nTimeMs):
+        """
+        Returns the index of the first event sent at or after nTimeMs, binary search over the sorted timestamps
+        """
+        return int(np.searchsorted(self.arrTimeMs, nTimeMs, side='left'))
+
+    def sliceByTime(self, nStartMs=None, nEndMs=None):
+        """
+        Returns a DataQueue view with the events sent in the interval [nStartMs, nEndMs)
+        """
+        nBegin = 0 if (nStartMs is None) else self.indexForTime(nStartMs)
+        nEnd   = len(self) if (nEndMs is None) else self.indexForTime(nEndMs)
+        return self[nBegin:max(nBegin, nEnd)]
+
+    def getPackage(self, nIndex):
+        """
+        Returns a DataPackage view for the event at nIndex
+        """
+        return DataPackage.fromIds(int(self.arrType[nIndex]), int(self.arrID[nIndex]), int(self.arrPayload[nIndex]),
+            self.lstHostIds[self.arrProd[nIndex]], self.lstHostIds[self.arrCons[nIndex]])
+
+    def getHostIndex(self, strHost):
+        """
+        Returns the interned index for a host name, -1 if the host is not in the queue
+        """
+        return self.hshHostIndex.get(strHost, -1)
+
+    def getHostNames(self):
+        """
+        Returns the names of all hosts referenced as producers or consumers
+        """
+        arrUsed = np.union1d(self.arrProd, self.arrCons)
+        return [self.lstHostNames[nIndex] for nIndex in arrUsed.tolist()]
+
+    def getPayloadSizes(self):
+        """
+        Returns a list with the distinct payload sizes in the queue
+        """
+        return np.unique(self.arrPayload).tolist()
+
+    def consumerInterests(self, strHost):
+        """
+        Returns a list of (nType, nID) consumed by a host
+        """
+        nHost = self.getHostIndex(strHost)
+        if (nHost < 0):
+            return []
+        arrMask = (self.arrCons == nHost)
+        return list(zip(self.arrType[arrMask].tolist(), self.arrID[arrMask].tolist()))
+
+    @staticmethod
+    def mergeSorted(lstQueues, lstHostNames):
+        """
+        k-way merge of time sorted DataQueues sharing the same host list. Queues are merged pairwise,
+        ties keep the order of lstQueues, so the result is the same as a stable sort of their concatenation.
+        """
+        lstRuns = [pQueue for pQueue in lstQueues if (len(pQueue) > 0)]
+        if (len(lstRuns) == 0):
+            return DataQueue([], [], [], [], [], [], lstHostNames)
+
+        while (len(lstRuns) > 1):
+            lstMerged = [DataQueue.mergeTwo(lstRuns[i], lstRuns[i+1]) for i in range(0, len(lstRuns)-1, 2)]
+            if (len(lstRuns) % 2 == 1):
+                lstMerged.append(lstRuns[-1])
+            lstRuns = lstMerged
+        return lstRuns[0]
+
+    @staticmethod
+    def mergeTwo(pFirst, pSecond):
+        """
+        Stable merge of two time sorted DataQueues, events from pFirst come first on ties
+        """
+        nTotal = len(pFirst) + len(pSecond)
+        arrPosFirst  = np.arange(len(pFirst)) + np.searchsorted(pSecond.arrTimeMs, pFirst.arrTimeMs, side='left')
+        arrPosSecond = np.arange(len(pSecond)) + np.searchsorted(pFirst.arrTimeMs, pSecond.arrTimeMs, side='right')
+
+        lstColumns = list()
+        for strColumn in ('arrTimeMs', 'arrType', 'arrID', 'arrPayload', 'arrProd', 'arrCons'):
+            arrFirst  = getattr(pFirst, strColumn)
+            arrMerged = np.empty(nTotal, dtype=arrFirst.dtype)
+            arrMerged[arrPosFirst]  = arrFirst
+            arrMerged[arrPosSecond] = getattr(pSecond, strColumn)
+            lstColumns.append(arrMerged)
+        return DataQueue(*lstColumns, lstHostNames=pFirst.lstHostNames)
+
+    @staticmethod
+    def fromList(lstDataQueue):
+        """
+        Creates a DataQueue from a list of [nTimeMs, DataPackage] pairs, keeping its order
+        """
+        pBuilder = DataQueueBuilder()
+        for (nTimeMs, pPackage) in lstDataQueue:
+            pBuilder.append([nTimeMs, pPackage])
+        return pBuilder.build(bSort=False)
+
+    @staticmethod
+    def toDataQueue(lstDataQueue):
+        """
+        Returns lstDataQueue as a DataQueue, converting it if it is a list of pairs
+        """
+        if (isinstance(lstDataQueue, DataQueue)):
+            return lstDataQueue
+        return DataQueue.fromList(lstDataQueue)
+
+
+class DataQueueBuilder:
+
+    def __init__(self):
+        """
+        Constructor. Accumulates events in compact arrays until build() is called.
+        """
+        self.arrTimeMs    = array.array('q')
+        self.arrType      = array.array('i')
+        self.arrID        = array.array('q')
+        self.arrPayload   = array.array('q')
+        self.arrProd      = array.array('i')
+        self.arrCons      = array.array('i')
+        self.lstHostNames = []
+        self.hshHostIndex = {}
+
+    def __len__(self):
+        return len(self.arrTimeMs)
+
+    def internHost(self, strHost):
+        """
+        Returns the index for a host name, adding it to the host list if needed
+        """
+        nIndex = self.hshHostIndex.get(strHost)
+        if (nIndex is None):
+            nIndex = len(self.lstHostNames)
+            self.hshHostIndex[strHost] = nIndex
+            self.lstHostNames.append(strHost)
+        return nIndex
+
+    def addEvent(self, nTimeMs, nType, nID, nPayloadSize, strProd, strCons):
+        """
+        Adds a new event to the queue
+        """
+        self.arrTimeMs.append(int(nTimeMs))
+        self.arrType.append(int(nType))
+        self.arrID.append(int(nID))
+        self.arrPayload.append(int(nPayloadSize))
+        self.arrProd.append(self.internHost(strProd))
+        self.arrCons.append(self.internHost(strCons))
+
+    def append(self, pItem):
+        """
+        List compatible append for [nTimeMs, DataPackage] pairs
+        """
+        (nTimeMs, pPackage) = pItem
+        self.addEvent(nTimeMs, pPackage.nType, pPackage.nID, pPackage.nPayloadSize, pPackage.strOrig, pPackage.strDest)
+
+    def build(self, bSort=True):
+        """
+        Returns the resulting DataQueue. Sorting is stable, events with the same timestamp keep their insertion order.
+        """
+        lstColumns = list()
+        for (arrColumn, dtColumn) in ((self.arrTimeMs, c_dtTimeMs), (self.arrType, c_dtType), (self.arrID, c_dtID),
+                                      (self.arrPayload, c_dtPayload), (self.arrProd, c_dtHost), (self.arrCons, c_dtHost)):
+            lstColumns.append(np.array(arrColumn, dtype=dtColumn))
+
+        if (bSort):
+            arrOrder   = np.argsort(lstColumns[0], kind='stable')
+            lstColumns = [arrColumn[arrOrder] for arrColumn in lstColumns]
+
+        logging.debug('[DataQueueBuilder.build] Built queue with %d events and %d hosts' % (len(self), len(self.lstHostNames)))
+        return DataQueue(*lstColumns, lstHostNames=self.lstHostNames)
@@ -0,0 +1,188 @@
+"""
+Payload file pool.
+
+Creates the payload files read by the producers (ndnputchunks) in-process,
+verifies their sizes and only returns once every file is ready. Files are
+described in a manifest and reused by later runs when they still match it.
+
+Small files hold base64 random data. Files of at least c_nLargePayloadSize use
+a cheaper backend:
+    pattern  space reserved with fallocate and filled with a deterministic pattern
+    sparse   a file with no allocated blocks, reads return zeros without disk I/O
+    random   same as the small files
+Every producer of a given size reads the same file, after prepare() the files are
+hinted into the page cache so they are served from a single resident copy.
+
+Created 18/10/2026
+"""
+import os
+import json
+import base64
+import hashlib
+import logging
+from os.path import basename, isfile, getsize
+
+# Constants --------------------------------
+c_strManifestFile   = 'payload_manifest.json'
+c_strTmpfsDir       = '/dev/shm'
+c_nWriteBlock       = 1 << 20
+c_nLargePayloadSize = 1 << 20
+c_lstBackends       = ['random', 'pattern', 'sparse']
+
+
+def nameForPayloadFile(nPayloadSize, strBasePath):
+    return strBasePath + '/' + 'file_' + str(int(nPayloadSize/1024)) + 'K'
+
+
+class PayloadPool:
+
+    def __init__(self, strBasePath, bUseTmpfs=False, strLargeBackend='pattern'):
+        """
+        Constructor. With bUseTmpfs the files are kept under /dev/shm, in a directory with the same name as strBasePath.
+        strLargeBackend is the backend used for files of at least c_nLargePayloadSize bytes.
+        """
+        if (strLargeBackend not in c_lstBackends):
+            raise Exception('[PayloadPool.__init__] Unknown backend=%s, options are %s' % (strLargeBackend, c_lstBackends))
+        if (bUseTmpfs):
+            strBasePath = os.path.join(c_strTmpfsDir, basename(strBasePath.rstrip('/')))
+        self.strBasePath     = strBasePath.rstrip('/')
+        self.strLargeBackend = strLargeBackend
+        self.hshManifest     = {}
+
+    def __repr__(self):
+        return '<PayloadPool path=%s, files=%d>' % (self.strBasePath, len(self.hshManifest))
+
+    def getFilePath(self, nPayloadSize):
+        """
+        Returns the path of the payload file for nPayloadSize
+        """
+        return nameForPayloadFile(nPayloadSize, self.strBasePath)
+
+    def backendForSize(self, nPayloadSize):
+        return self.strLargeBackend if (nPayloadSize >= c_nLargePayloadSize) else 'random'
+
+    def prepare(self, lstPayloadSizes):
+        """
+        Makes sure there is a payload file for every size in lstPayloadSizes. Blocks until all files are written and verified.
+        Returns the number of files created.
+        """
+        os.makedirs(self.strBasePath, exist_ok=True)
+        self.hshManifest = self.loadManifest()
+
+        nFilesCreated = 0
+        for nPayloadSize in sorted(set(int(nSize) for nSize in lstPayloadSizes)):
+            strFileName = self.getFilePath(nPayloadSize)
+            if (not self.isFileReady(strFileName, nPayloadSize)):
+                self.createFile(strFileName, nPayloadSize)
+                nFilesCreated += 1
+
+            if (getsize(strFileName) != nPayloadSize):
+                raise Exception('[PayloadPool.prepare] File=%s has size=%d, expected=%d' % (strFileName, getsize(strFileName), nPayloadSize))
+            PayloadPool.adviseWillNeed(strFileName)
+
+        self.saveManifest()
+        logging.info('[PayloadPool.prepare] %d payload files ready in path=%s, created=%d' % (len(set(lstPayloadSizes)), self.strBasePath, nFilesCreated))
+        return nFilesCreated
+
+    def isFileReady(self, strFileName, nPayloadSize):
+        """
+        A file can be reused if the manifest describes it with the expected size and it was not changed since
+        """
+        hshEntry = self.hshManifest.get(basename(strFileName))
+        if (hshEntry is None) or (not isfile(strFileName)):
+            return False
+        pStat = os.stat(strFileName)
+        return ((hshEntry['size'] == nPayloadSize) and (pStat.st_size == nPayloadSize) and (hshEntry['mtime_ns'] == pStat.st_mtime_ns) and
+                (hshEntry.get('backend', 'random') == self.backendForSize(nPayloadSize)))
+
+    def createFile(self, strFileName, nPayloadSize):
+        """
+        Writes nPayloadSize bytes with the backend for its size. The file is written under a temporary
+        name and renamed, so a producer never reads a partial file.
+        """
+        strBackend = self.backendForSize(nPayloadSize)
+        strTmpName = strFileName + '.tmp'
+        pDigest    = hashlib.sha1()
+        with open(strTmpName, 'wb') as pFile:
+            if (strBackend == 'sparse'):
+                # Only the size is set, no blocks are allocated
+                pFile.truncate(nPayloadSize)
+                bytBlock = bytes(c_nWriteBlock)
+            elif (strBackend == 'pattern'):
+                PayloadPool.allocate(pFile.fileno(), nPayloadSize)
+                bytBlock = PayloadPool.patternBlock(nPayloadSize)
+
+            nWritten = 0
+            while (nWritten < nPayloadSize):
+                nCount = min(c_nWriteBlock, nPayloadSize - nWritten)
+                if (strBackend == 'random'):
+                    # base64 produces 4 characters for every 3 bytes
+                    bytBlock = base64.b64encode(os.urandom((nCount*3)//4 + 3))[:nCount]
+                if (strBackend != 'sparse'):
+                    pFile.write(bytBlock[:nCount])
+                pDigest.update(bytBlock[:nCount])
+                nWritten += nCount
+            pFile.flush()
+            os.fsync(pFile.fileno())
+        os.replace(strTmpName, strFileName)
+
+        self.hshManifest[basename(strFileName)] = {'size': nPayloadSize, 'mtime_ns': os.stat(strFileName).st_mtime_ns, 'sha1': pDigest.hexdigest(),
+                                                   'backend': strBackend}
+        logging.info('[PayloadPool.createFile] Created file=%s with size=%d, backend=%s' % (strFileName, nPayloadSize, strBackend))
+
+    @staticmethod
+    def patternBlock(nPayloadSize):
+        """
+        Returns c_nWriteBlock bytes of printable data that only depends on nPayloadSize
+        """
+        lstParts = []
+        bytSeed  = str(nPayloadSize).encode('ascii')
+        nLen     = 0
+        while (nLen < c_nWriteBlock):
+            bytSeed = hashlib.sha256(bytSeed).digest()
+            bytPart = base64.b64encode(bytSeed)
+            lstParts.append(bytPart)
+            nLen += len(bytPart)
+        return b''.join(lstParts)[:c_nWriteBlock]
+
+    @staticmethod
+    def allocate(nFd, nPayloadSize):
+        """
+        Reserves the blocks of the file at once, not every file system or platform supports it
+        """
+        if (hasattr(os, 'posix_fallocate')):
+            try:
+                os.posix_fallocate(nFd, 0, nPayloadSize)
+            except OSError as e:
+                logging.info('[PayloadPool.allocate] fallocate not available, error=%s' % str(e))
+
+    @staticmethod
+    def adviseWillNeed(strFileName):
+        """
+        Asks the kernel to load the file into the page cache, so producers read it from memory
+        """
+        if (hasattr(os, 'posix_fadvise')):
+            nFd = os.open(strFileName, os.O_RDONLY)
+            try:
+                os.posix_fadvise(nFd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(nFd)
+
+    def loadManifest(self):
+        """
+        Returns the manifest saved by a previous run, empty if there is none or it can not be read
+        """
+        strPath = self.strBasePath + '/' + c_strManifestFile
+        if (not isfile(strPath)):
+            return {}
+        try:
+            with open(strPath, 'r') as pFile:
+                return json.load(pFile)
+        except ValueError:
+            logging.error('[PayloadPool.loadManifest] Could not read manifest=%s, files will be created again' % strPath)
+            return {}
+
+    def saveManifest(self):
+        strPath = self.strBasePath + '/' + c_strManifestFile
+        with open(strPath, 'w') as pFile:
+            json.dump(self.hshManifest, pFile, indent=2, sort_keys=True)
@@ -0,0 +1,190 @@
+"""
+Binary data queue file.
+
+Layout, all values little endian:
+    header      magic, version, number of records, host table size and records offset,
+                since version 2 also the time index offset, block size and number of entries
+    host table  host names separated by '\\n', UTF-8
+    records     fixed width records (c_dtRecord) starting at a 64 byte aligned offset
+    time index  (version 2) timestamp of the first record of every block of nIndexBlock records,
+                starting at a 64 byte aligned offset
+
+The records are mapped with numpy.memmap, so loading does not depend on the queue size.
+They can also be streamed in blocks with iterQueueFile, starting at any time: the time index
+finds the block holding the first event with a binary search, so only that block is read.
+
+Created 18/10/2026
+"""
+import logging
+import struct
+
+import numpy as np
+
+from .data_queue import DataQueue
+from .data_package import DataPackage
+from icnexperiment.generics import g_pHostTable
+
+# Constants --------------------------------
+c_bytMagic      = b'C2DQ'
+c_nVersion      = 2
+c_strHeaderV1   = '<4sHHQIIQ'
+c_strHeaderV2   = '<QII'
+c_nHeaderV1Size = struct.calcsize(c_strHeaderV1)
+c_nHeaderSize   = c_nHeaderV1Size + struct.calcsize(c_strHeaderV2)
+c_nAlignment    = 64
+c_nWriteBlock   = 1 << 16
+c_nIndexBlock   = 1 << 12
+c_dtRecord      = np.dtype([('nTimeMs', '<i8'), ('nID', '<i8'), ('nPayload', '<i8'),
+                            ('nType', '<i4'), ('nProd', '<i4'), ('nCons', '<i4'), ('nFlags', '<i4')])
+
+
+def writeQueueFile(pDataQueue, strPath):
+    """
+    Writes a DataQueue to strPath in the binary queue format
+    """
+    bytHostTable   = '\n'.join(pDataQueue.lstHostNames).encode('utf-8')
+    nRecordsOffset = alignOffset(c_nHeaderSize + len(bytHostTable))
+    nIndexOffset   = alignOffset(nRecordsOffset + len(pDataQueue)*c_dtRecord.itemsize)
+    arrBlockTimes  = np.ascontiguousarray(pDataQueue.arrTimeMs[::c_nIndexBlock], dtype='<i8')
+    bytHeader = struct.pack(c_strHeaderV1, c_bytMagic, c_nVersion, 0, len(pDataQueue), len(pDataQueue.lstHostNames), len(bytHostTable), nRecordsOffset)
+    bytHeader += struct.pack(c_strHeaderV2, nIndexOffset, c_nIndexBlock, len(arrBlockTimes))
+
+    with open(strPath, 'wb') as pFile:
+        pFile.write(bytHeader)
+        pFile.write(bytHostTable)
+        pFile.write(b'\0' * (nRecordsOffset - c_nHeaderSize - len(bytHostTable)))
+
+        # Write records in blocks to bound the temporary memory used
+        for nBegin in range(0, len(pDataQueue), c_nWriteBlock):
+            nEnd = min(nBegin + c_nWriteBlock, len(pDataQueue))
+            arrRecords = np.zeros(nEnd - nBegin, dtype=c_dtRecord)
+            arrRecords['nTimeMs']  = pDataQueue.arrTimeMs[nBegin:nEnd]
+            arrRecords['nID']      = pDataQueue.arrID[nBegin:nEnd]
+            arrRecords['nPayload'] = pDataQueue.arrPayload[nBegin:nEnd]
+            arrRecords['nType']    = pDataQueue.arrType[nBegin:nEnd]
+            arrRecords['nProd']    = pDataQueue.arrProd[nBegin:nEnd]
+            arrRecords['nCons']    = pDataQueue.arrCons[nBegin:nEnd]
+            pFile.write(arrRecords.tobytes())
+
+        pFile.write(b'\0' * (nIndexOffset - pFile.tell()))
+        pFile.write(arrBlockTimes.tobytes())
+
+    logging.info('[writeQueueFile] Saved %d packages to path=%s' % (len(pDataQueue), strPath))
+
+def readQueueHeader(strPath):
+    """
+    Returns the tuple (nRecords, lstHostNames, nRecordsOffset) read from a binary queue file
+    """
+    hshHeader = readHeaderFields(strPath)
+    return (hshHeader['nRecords'], hshHeader['lstHostNames'], hshHeader['nRecordsOffset'])
+
+def readHeaderFields(strPath):
+    """
+    Returns a dictionary with all header fields of a binary queue file. Version 1 files have no time index,
+    nIndexOffset is then 0.
+    """
+    with open(strPath, 'rb') as pFile:
+        bytHeader = pFile.read(c_nHeaderV1Size)
+        if (len(bytHeader) < c_nHeaderV1Size):
+            raise Exception('[readQueueHeader] File=%s is too short to be a queue file' % strPath)
+
+        (bytMagic, nVersion, nReserved, nRecords, nHosts, nHostTableSize, nRecordsOffset) = struct.unpack(c_strHeaderV1, bytHeader)
+        if (bytMagic != c_bytMagic):
+            raise Exception('[readQueueHeader] File=%s is not a queue file, magic=%s' % (strPath, bytMagic))
+        if (nVersion > c_nVersion):
+            raise Exception('[readQueueHeader] File=%s has unsupported version=%d' % (strPath, nVersion))
+
+        (nIndexOffset, nIndexBlock, nIndexEntries) = (0, 0, 0)
+        if (nVersion >= 2):
+            (nIndexOffset, nIndexBlock, nIndexEntries) = struct.unpack(c_strHeaderV2, pFile.read(c_nHeaderSize - c_nHeaderV1Size))
+
+        bytHostTable = pFile.read(nHostTableSize)
+
+    lstHostNames = bytHostTable.decode('utf-8').split('\n') if (nHosts > 0) else []
+    if (len(lstHostNames) != nHosts):
+        raise Exception('[readQueueHeader] File=%s expected %d hosts, read %d' % (strPath, nHosts, len(lstHostNames)))
+    return {'nVersion': nVersion, 'nRecords': nRecords, 'lstHostNames': lstHostNames, 'nRecordsOffset': nRecordsOffset,
+            'nIndexOffset': nIndexOffset, 'nIndexBlock': nIndexBlock, 'nIndexEntries': nIndexEntries}
+
+def readQueueIndex(strPath):
+    """
+    Returns the tuple (arrBlockTimes, nIndexBlock) with the time index of a binary queue file,
+    or None for files written before version 2
+    """
+    hshHeader = readHeaderFields(strPath)
+    if (hshHeader['nIndexOffset'] == 0):
+        return None
+    with open(strPath, 'rb') as pFile:
+        pFile.seek(hshHeader['nIndexOffset'])
+        arrBlockTimes = np.fromfile(pFile, dtype='<i8', count=hshHeader['nIndexEntries'])
+    return (arrBlockTimes, hshHeader['nIndexBlock'])
+
+def seekQueueFile(strPath, nTimeMs):
+    """
+    Returns the index of the first record sent at or after nTimeMs, len if there is none.
+    Uses the time index to read a single block, files without index are searched over the memory mapped timestamps.
+    """
+    hshHeader = readHeaderFields(strPath)
+    nRecords  = hshHeader['nRecords']
+    if (nRecords == 0):
+        return 0
+
+    pIndex = readQueueIndex(strPath)
+    if (pIndex is None):
+        arrRecords = np.memmap(strPath, dtype=c_dtRecord, mode='r', offset=hshHeader['nRecordsOffset'], shape=(nRecords,))
+        return int(np.searchsorted(arrRecords['nTimeMs'], nTimeMs, side='left'))
+
+    # The first record at or after nTimeMs is in the last block that starts before nTimeMs
+    (arrBlockTimes, nIndexBlock) = pIndex
+    nBlock = max(int(np.searchsorted(arrBlockTimes, nTimeMs, side='left')) - 1, 0)
+    nFirst = nBlock * nIndexBlock
+    with open(strPath, 'rb') as pFile:
+        pFile.seek(hshHeader['nRecordsOffset'] + nFirst*c_dtRecord.itemsize)
+        arrRecords = np.fromfile(pFile, dtype=c_dtRecord, count=min(nIndexBlock, nRecords - nFirst))
+    return nFirst + int(np.searchsorted(arrRecords['nTimeMs'], nTimeMs, side='left'))
+
+def readQueueFile(strPath):
+    """
+    Returns a DataQueue whose columns are views over the memory mapped records of strPath
+    """
+    (nRecords, lstHostNames, nRecordsOffset) = readQueueHeader(strPath)
+    if (nRecords == 0):
+        # Empty files can not be mapped
+        arrRecords = np.zeros(0, dtype=c_dtRecord)
+    else:
+        arrRecords = np.memmap(strPath, dtype=c_dtRecord, mode='r', offset=nRecordsOffset, shape=(nRecords,))
+
+    logging.info('[readQueueFile] Mapped %d packages from path=%s' % (nRecords, strPath))
+    return DataQueue(arrRecords['nTimeMs'], arrRecords['nType'], arrRecords['nID'], arrRecords['nPayload'],
+        arrRecords['nProd'], arrRecords['nCons'], lstHostNames)
+
+def iterQueueFile(strPath, nBlockSize, nStartMs=None, nEndMs=None):
+    """
+    Yields (nTimeMs, DataPackage) tuples from a binary queue file, reading at most nBlockSize records at a time.
+    Only events with nStartMs <= nTimeMs < nEndMs are returned, reading starts directly at nStartMs.
+    """
+    (nRecords, lstHostNames, nRecordsOffset) = readQueueHeader(strPath)
+    lstHostIds = g_pHostTable.internAll(lstHostNames)
+    nRead = 0
+    if (nStartMs is not None):
+        nRead = seekQueueFile(strPath, nStartMs)
+
+    with open(strPath, 'rb') as pFile:
+        pFile.seek(nRecordsOffset + nRead*c_dtRecord.itemsize)
+        while (nRead < nRecords):
+            nCount = min(nBlockSize, nRecords - nRead)
+            arrRecords = np.fromfile(pFile, dtype=c_dtRecord, count=nCount)
+            if (len(arrRecords) < nCount):
+                raise Exception('[iterQueueFile] File=%s is truncated, expected %d records, read %d' % (strPath, nRecords, nRead + len(arrRecords)))
+            nRead += nCount
+
+            if (nEndMs is not None) and (arrRecords['nTimeMs'][-1] >= nEndMs):
+                # Last block of the requested interval
+                arrRecords = arrRecords[:np.searchsorted(arrRecords['nTimeMs'], nEndMs, side='left')]
+                nRead = nRecords
+
+            for (nTimeMs, nID, nPayload, nType, nProd, nCons, nFlags) in arrRecords.tolist():
+                yield (nTimeMs, DataPackage.fromIds(nType, nID, nPayload, lstHostIds[nProd], lstHostIds[nCons]))
+
+def alignOffset(nOffset):
+    return ((nOffset + c_nAlignment - 1) // c_nAlignment) * c_nAlignment
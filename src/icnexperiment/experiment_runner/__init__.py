@@ -0,0 +1,2 @@
+from .scheduler import EventScheduler, LatenessStats
+from .host_agent import HostAgent
@@ -0,0 +1,83 @@
+"""
+Client for the per-host agent (host_agent.py).
+
+The agent is started once inside a host and launches ndnputchunks/ndncatchunks
+on request, so each interest costs one line written to a pipe instead of a
+popen through mnexec and a shell. Requests are serialized per agent, the
+runner can share one HostAgent between threads.
+
+Created 18/10/2026
+"""
+import sys
+import json
+import signal
+import logging
+import threading
+import subprocess
+
+# Constants --------------------------------
+c_sCloseTimeoutSec = 2.0
+
+
+class HostAgent:
+
+    def __init__(self, pHost, strScriptPath):
+        """
+        Constructor. Starts the agent script at strScriptPath inside pHost.
+        """
+        self.strHost  = str(pHost)
+        self.pLock    = threading.Lock()
+        self.nNextId  = 0
+        self.proc     = pHost.popen([sys.executable, strScriptPath], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL)
+        self.nAgentPid = self.request({'op': 'ping'})
+
+    def __repr__(self):
+        return '<HostAgent host=%s, pid=%d>' % (self.strHost, self.proc.pid)
+
+    def request(self, hshCommand):
+        """
+        Sends one command and waits for its reply. Returns the pid in the reply, raises if the agent reported an error.
+        """
+        with self.pLock:
+            self.nNextId += 1
+            hshCommand['id'] = self.nNextId
+            self.proc.stdin.write((json.dumps(hshCommand) + '\n').encode('utf-8'))
+            self.proc.stdin.flush()
+            bytLine = self.proc.stdout.readline()
+
+        if (not bytLine):
+            raise Exception('[HostAgent.request] Agent for host=%s exited, returncode=%s' % (self.strHost, self.proc.poll()))
+        hshReply = json.loads(bytLine.decode('utf-8'))
+        if ('error' in hshReply):
+            raise Exception('[HostAgent.request] Agent for host=%s failed op=%s, error=%s' % (self.strHost, hshCommand['op'], hshReply['error']))
+        return hshReply['pid']
+
+    def serve(self, strName, nTTL, strFilePath):
+        """
+        Starts ndnputchunks for strName serving strFilePath, returns its pid
+        """
+        return self.request({'op': 'serve', 'name': strName, 'ttl': nTTL, 'file': strFilePath})
+
+    def fetch(self, strName):
+        """
+        Starts ndncatchunks for strName, returns its pid
+        """
+        return self.request({'op': 'fetch', 'name': strName})
+
+    def kill(self, nPid, nSignal=signal.SIGKILL):
+        return self.request({'op': 'kill', 'pid': nPid, 'sig': int(nSignal)})
+
+    def close(self):
+        """
+        Stops the agent. Processes it started keep running.
+        """
+        if (self.proc.poll() is None):
+            try:
+                self.request({'op': 'quit'})
+                self.proc.stdin.close()
+                self.proc.wait(timeout=c_sCloseTimeoutSec)
+            except Exception as e:
+                logging.warning('[HostAgent.close] Agent for host=%s did not quit, killing it. Error=%s' % (self.strHost, str(e)))
+                self.proc.kill()
+                self.proc.wait()
@@ -0,0 +1,185 @@
+"""
+Event scheduler for the experiment runner.
+
+Events are dispatched at their mission time measured with time.monotonic_ns(),
+which is not affected by changes to the wall clock. The scheduler sleeps until
+shortly before each event and spins for the last stretch, so wakeups are precise
+without burning CPU during long gaps. The lateness of every dispatch is recorded.
+runAsync() follows the same timeline inside an asyncio event loop, there the
+dispatch function must not block and waits only sleep, so other tasks keep running.
+
+Created 18/10/2026
+"""
+import time
+import heapq
+import asyncio
+import logging
+
+# Constants --------------------------------
+c_sSpinThresholdMs = 2.0
+c_sLateThresholdMs = 5.0
+c_lstLatenessBucketsMs = [0.1, 0.5, 1, 2, 5, 10, 50, 100, 500, 1000]
+
+
+class LatenessStats:
+
+    def __init__(self, sLateThresholdMs=c_sLateThresholdMs):
+        """
+        Constructor. Events dispatched more than sLateThresholdMs after their time are counted as late.
+        """
+        self.sLateThresholdMs = sLateThresholdMs
+        self.nCount           = 0
+        self.nLate            = 0
+        self.sSumMs           = 0.0
+        self.sMaxMs           = 0.0
+        self.lstBuckets       = [0] * (len(c_lstLatenessBucketsMs) + 1)
+
+    def __repr__(self):
+        return '<LatenessStats %s>' % self.summary()
+
+    def add(self, sLatenessMs):
+        self.nCount += 1
+        self.sSumMs += sLatenessMs
+        if (sLatenessMs > self.sMaxMs):
+            self.sMaxMs = sLatenessMs
+        if (sLatenessMs > self.sLateThresholdMs):
+            self.nLate += 1
+
+        nBucket = 0
+        while (nBucket < len(c_lstLatenessBucketsMs)) and (sLatenessMs > c_lstLatenessBucketsMs[nBucket]):
+            nBucket += 1
+        self.lstBuckets[nBucket] += 1
+
+    def avgMs(self):
+        return (self.sSumMs / self.nCount) if (self.nCount > 0) else 0.0
+
+    def summary(self):
+        """
+        Returns a one line description of the lateness distribution
+        """
+        lstParts = list()
+        for nBucket in range(len(self.lstBuckets)):
+            if (self.lstBuckets[nBucket] > 0):
+                strLabel = ('<=%sms' % c_lstLatenessBucketsMs[nBucket]) if (nBucket < len(c_lstLatenessBucketsMs)) else ('>%sms' % c_lstLatenessBucketsMs[-1])
+                lstParts.append('%s:%d' % (strLabel, self.lstBuckets[nBucket]))
+        return 'events=%d; late=%d; avgMs=%.3f; maxMs=%.3f; buckets={%s}' % (self.nCount, self.nLate, self.avgMs(), self.sMaxMs, ', '.join(lstParts))
+
+
+class EventScheduler:
+
+    def __init__(self, nStartMs=0, sSpinThresholdMs=c_sSpinThresholdMs):
+        """
+        Constructor. Mission time nStartMs corresponds to the moment start() is called.
+        """
+        self.nStartMs  = nStartMs
+        self.nSpinNs   = int(sSpinThresholdMs * 1000000)
+        self.nOriginNs = None
+        self.nSequence = 0
+        self.lstTimers = []
+        self.pStats    = LatenessStats()
+
+    def start(self):
+        """
+        Sets the monotonic origin of the mission clock
+        """
+        self.nOriginNs = time.monotonic_ns()
+
+    def elapsedMs(self):
+        """
+        Returns the time in ms since start()
+        """
+        return (time.monotonic_ns() - self.nOriginNs) / 1000000.0
+
+    def missionTimeMs(self):
+        return self.elapsedMs() + self.nStartMs
+
+    def schedule(self, nTimeMs, fnCallback, pItem=None):
+        """
+        Schedules fnCallback(nTimeMs, pItem) at mission time nTimeMs. Timers with the same time run in the order they were added.
+        """
+        heapq.heappush(self.lstTimers, (nTimeMs, self.nSequence, fnCallback, pItem))
+        self.nSequence += 1
+
+    def waitUntil(self, nTimeMs):
+        """
+        Blocks until mission time nTimeMs, returns how late in ms the call returned
+        """
+        nTargetNs = self.nOriginNs + int((nTimeMs - self.nStartMs) * 1000000)
+        nRemainingNs = nTargetNs - time.monotonic_ns()
+        while (nRemainingNs > 0):
+            if (nRemainingNs > self.nSpinNs):
+                time.sleep((nRemainingNs - self.nSpinNs) / 1000000000.0)
+            nRemainingNs = nTargetNs - time.monotonic_ns()
+        return -nRemainingNs / 1000000.0
+
+    def popNext(self, itEvents, pNextEvent, fnDispatch):
+        """
+        Returns (nTimeMs, fnCallback, pItem, pNextEvent) for the earliest of the next stream event and the first timer
+        """
+        if (len(self.lstTimers) > 0) and ((pNextEvent is None) or (self.lstTimers[0][0] < pNextEvent[0])):
+            (nTimeMs, nSequence, fnCallback, pItem) = heapq.heappop(self.lstTimers)
+            return (nTimeMs, fnCallback, pItem, pNextEvent)
+        (nTimeMs, pItem) = pNextEvent
+        return (nTimeMs, fnDispatch, pItem, next(itEvents, None))
+
+    def run(self, itEvents, fnDispatch, sMaxTimeSec=None):
+        """
+        Dispatches the time ordered (nTimeMs, pItem) pairs of itEvents with fnDispatch(nTimeMs, pItem), merged with the
+        timers added by schedule(). Stops when both are exhausted or after sMaxTimeSec of mission time. Returns the LatenessStats.
+        """
+        if (self.nOriginNs is None):
+            self.start()
+
+        sMaxTimeMs = None if (sMaxTimeSec is None) else (self.nStartMs + sMaxTimeSec*1000)
+        itEvents   = iter(itEvents)
+        pNextEvent = next(itEvents, None)
+        while (pNextEvent is not None) or (len(self.lstTimers) > 0):
+            (nTimeMs, fnCallback, pItem, pNextEvent) = self.popNext(itEvents, pNextEvent, fnDispatch)
+            if (sMaxTimeMs is not None) and ((nTimeMs > sMaxTimeMs) or (self.missionTimeMs() > sMaxTimeMs)):
+                logging.info('[EventScheduler.run] Reached maximum experiment time=%ss' % sMaxTimeSec)
+                break
+
+            sLatenessMs = self.waitUntil(nTimeMs)
+            self.pStats.add(sLatenessMs)
+            if (sLatenessMs > self.pStats.sLateThresholdMs):
+                logging.debug('[EventScheduler.run] Late dispatch nTimeMs=%d; latenessMs=%.3f' % (nTimeMs, sLatenessMs))
+            fnCallback(nTimeMs, pItem)
+
+        logging.info('[EventScheduler.run] Done in %.3f seconds, lateness %s' % (self.elapsedMs()/1000.0, self.pStats.summary()))
+        return self.pStats
+
+    async def waitUntilAsync(self, nTimeMs):
+        """
+        Sleeps in the event loop until mission time nTimeMs, returns how late in ms the call returned
+        """
+        nTargetNs = self.nOriginNs + int((nTimeMs - self.nStartMs) * 1000000)
+        nRemainingNs = nTargetNs - time.monotonic_ns()
+        while (nRemainingNs > 0):
+            await asyncio.sleep(nRemainingNs / 1000000000.0)
+            nRemainingNs = nTargetNs - time.monotonic_ns()
+        return -nRemainingNs / 1000000.0
+
+    async def runAsync(self, itEvents, fnDispatch, sMaxTimeSec=None):
+        """
+        Same as run() inside a running event loop. fnDispatch must return without blocking, for example by creating tasks.
+        """
+        if (self.nOriginNs is None):
+            self.start()
+
+        sMaxTimeMs = None if (sMaxTimeSec is None) else (self.nStartMs + sMaxTimeSec*1000)
+        itEvents   = iter(itEvents)
+        pNextEvent = next(itEvents, None)
+        while (pNextEvent is not None) or (len(self.lstTimers) > 0):
+            (nTimeMs, fnCallback, pItem, pNextEvent) = self.popNext(itEvents, pNextEvent, fnDispatch)
+            if (sMaxTimeMs is not None) and ((nTimeMs > sMaxTimeMs) or (self.missionTimeMs() > sMaxTimeMs)):
+                logging.info('[EventScheduler.runAsync] Reached maximum experiment time=%ss' % sMaxTimeSec)
+                break
+
+            sLatenessMs = await self.waitUntilAsync(nTimeMs)
+            self.pStats.add(sLatenessMs)
+            if (sLatenessMs > self.pStats.sLateThresholdMs):
+                logging.debug('[EventScheduler.runAsync] Late dispatch nTimeMs=%d; latenessMs=%.3f' % (nTimeMs, sLatenessMs))
+            fnCallback(nTimeMs, pItem)
+
+        logging.info('[EventScheduler.runAsync] Done in %.3f seconds, lateness %s' % (self.elapsedMs()/1000.0, self.pStats.summary()))
+        return self.pStats
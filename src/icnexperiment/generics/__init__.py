@@ -1 +1,2 @@
-from .generics import floatToDatetime, curDatetimeToFloat
\ No newline at end of file
+from .generics import floatToDatetime, curDatetimeToFloat
+from .name_table import NameTable, g_pHostTable, c_strHostTableFile
@@ -0,0 +1,85 @@
+"""
+Name interning table. Host names are stored once and referred to by small
+integer ids, shared by data generation, the experiment runner and result analysis.
+
+Created 18/10/2026
+"""
+import logging
+
+# Constants --------------------------------
+c_strHostTableFile = 'host_table.txt'
+
+
+class NameTable:
+
+    __slots__ = ('lstNames', 'hshIds')
+
+    def __init__(self, lstNames=()):
+        """
+        Constructor. Names in lstNames get the ids 0, 1, ... in order.
+        """
+        self.lstNames = []
+        self.hshIds   = {}
+        for strName in lstNames:
+            self.intern(strName)
+
+    def __len__(self):
+        return len(self.lstNames)
+
+    def __contains__(self, strName):
+        return strName in self.hshIds
+
+    def __repr__(self):
+        return '<NameTable len=%d>' % len(self)
+
+    def intern(self, strName):
+        """
+        Returns the id for strName, adding it to the table if needed
+        """
+        nId = self.hshIds.get(strName)
+        if (nId is None):
+            nId = len(self.lstNames)
+            self.hshIds[strName] = nId
+            self.lstNames.append(strName)
+        return nId
+
+    def internAll(self, lstNames):
+        """
+        Returns a list with the ids for all names in lstNames
+        """
+        return [self.intern(strName) for strName in lstNames]
+
+    def getId(self, strName):
+        """
+        Returns the id for strName, -1 if it is not in the table
+        """
+        return self.hshIds.get(strName, -1)
+
+    def getName(self, nId):
+        return self.lstNames[nId]
+
+    def getNames(self):
+        return list(self.lstNames)
+
+    def saveToFile(self, strPath):
+        """
+        Writes the table to strPath, one name per line in id order
+        """
+        with open(strPath, 'w') as pFile:
+            for strName in self.lstNames:
+                pFile.write(strName + '\n')
+        logging.info('[NameTable.saveToFile] Saved %d names to path=%s' % (len(self), strPath))
+
+    def loadFromFile(self, strPath):
+        """
+        Interns the names read from a file written by saveToFile. Loading into an empty table restores the same ids.
+        """
+        with open(strPath, 'r') as pFile:
+            for strLine in pFile:
+                if (strLine.strip() != ''):
+                    self.intern(strLine.strip())
+        logging.info('[NameTable.loadFromFile] Table has %d names after reading path=%s' % (len(self), strPath))
+
+
+# Host names shared by DataPackage and Transmission
+g_pHostTable = NameTable()
@@ -11,25 +11,27 @@ from os import listdir
 import re
 
 from .transmission import Transmission
+from icnexperiment.data_generation import DataQueue
+from icnexperiment.generics import g_pHostTable, c_strHostTableFile
 
 # Constants ----------------------------------------------------
 c_strConsumerLog = 'consumer.log'
 
 def readNFDLogs(strBasePath, lstData, lstHostNames):
-
+    """
+    Reads the nfd.log for each host in lstHostNames. lstData can be a DataQueue or a list of [nTimeMs, DataPackage] pairs.
+    """
     # strBasePath contains the directories for each node
     lstDirs = listdir(strBasePath)
     hshNodes = {}
+    loadHostTable(strBasePath)
+    pDataQueue = DataQueue.toDataQueue(lstData)
 
     for strHost in lstDirs:
         if (strHost in lstHostNames):
             strNfdPath = strBasePath + '/' + strHost + '/nfd.log'
 
-            lstConsumerInterests = list()
-            for (nTimestamp, pPackage) in lstData:
-                if (pPackage.strDest == strHost):
-                    lstConsumerInterests.append((pPackage.nType, pPackage.nID))
-
+            lstConsumerInterests = pDataQueue.consumerInterests(strHost)
             lstTransmissions = readTrasmissionsForHost(strHost, strNfdPath, lstConsumerInterests)
             if (lstTransmissions is not None):
                 # None will be returned if the file does not exist
@@ -40,6 +42,14 @@ def readNFDLogs(strBasePath, lstData, lstHostNames):
 
     return hshNodes
 
+def loadHostTable(strBasePath):
+    """
+    Loads the host table saved with the logs, if any, so host ids match the ones used while running
+    """
+    strTablePath = strBasePath + '/' + c_strHostTableFile
+    if (isfile(strTablePath)):
+        g_pHostTable.loadFromFile(strTablePath)
+
 def avgTransTimeForList(lstTransmissions):
     sSum = 0.0
     nSamples = 0
@@ -176,6 +186,7 @@ def readConsumerLogs(strPath):
     lstNodes = listdir(strPath)
     lstTransmissions = list()
     hshNodes = {}
+    loadHostTable(strPath)
 
     # Visit nodes (directories) one by one
     for strConsumer in lstNodes:
@@ -5,18 +5,25 @@ Represents a transmission between a producer and a consumer as read from the con
 Andre Dexheimer Carneiro        28/12/2020
 """
 import re
+import sys
 
-from icnexperiment.generics import floatToDatetime
+from icnexperiment.generics import floatToDatetime, g_pHostTable
+
+# Interest filter format /C2Data/<strOrig>/C2Data-<ID>-Type<Type>
+c_reInterest = re.compile(r'.*\/([a-zA-Z0-9]+)\/C2Data-([0-9]+)-Type([0-9]+)')
 
 class Transmission:
 
+    # Consumer and producer are kept as ids in g_pHostTable, -1 if unknown
+    __slots__ = ('strInterest', 'sDelayUs', 'dtDate', 'strStatus', 'nCons', 'nProd', 'nDataID', 'nDataType', 'nPayload')
+
     def __init__(self, strConsumer, strInterest, delayUs, strStatus, timeSinceEpoch=0, nPayload=0):
         self.strInterest = strInterest
         self.sDelayUs    = float(delayUs)
         self.dtDate      = floatToDatetime(float(timeSinceEpoch))
-        self.strStatus   = strStatus
-        self.strCons     = strConsumer
-        self.strProd     = ''
+        self.strStatus   = sys.intern(strStatus)
+        self.nCons       = g_pHostTable.intern(strConsumer)
+        self.nProd       = -1
         self.nDataID     = -1
         self.nDataType   = -1
         self.nPayload    = int(nPayload)
@@ -27,17 +34,29 @@ class Transmission:
     
     def __repr__(self):
         return '<Transmission> (%s to %s) interest=%s, timeDiff=%f, status=%s, timeSinceEpoch=%s' % (self.strProd, self.strCons, self.strInterest, self.sDelayUs, self.strStatus, self.dtDate.strftime('%d/%m/%Y %H:%M:%S.%f'))
-    
+
+    def __reduce__(self):
+        # Ids are only valid in the process that created them, names are pickled instead
+        return (Transmission.fromState, (self.strInterest, self.sDelayUs, self.dtDate, self.strStatus, self.strCons, self.strProd,
+            self.nDataID, self.nDataType, self.nPayload))
+
+    @property
+    def strCons(self):
+        return g_pHostTable.lstNames[self.nCons]
+
+    @property
+    def strProd(self):
+        return g_pHostTable.lstNames[self.nProd] if (self.nProd >= 0) else ''
+
     def processInterestFilter(self):
         """
         Reads interest filter for origin host, destination host, data type and data ID.
         Interest filter format /C2Data/<strOrig>/C2Data-<ID>-Type<Type>.
         Returns True if data was successfully read.
         """
-        strRegex = r'.*\/([a-zA-Z0-9]+)\/C2Data-([0-9]+)-Type([0-9]+)'
-        pMatch = re.match(strRegex, self.strInterest)
+        pMatch = c_reInterest.match(self.strInterest)
         if (pMatch):
-            self.strProd   = pMatch.group(1)
+            self.nProd     = g_pHostTable.intern(pMatch.group(1))
             self.nDataID   = int(pMatch.group(2))
             self.nDataType = int(pMatch.group(3))
             return True
@@ -52,6 +71,23 @@ class Transmission:
     def isTimeout(self):
         return (self.strStatus == 'TIMEOUT')
     
+    @staticmethod
+    def fromState(strInterest, sDelayUs, dtDate, strStatus, strCons, strProd, nDataID, nDataType, nPayload):
+        """
+        Rebuilds a pickled Transmission, interning its host names in this process
+        """
+        pTrans = Transmission.__new__(Transmission)
+        pTrans.strInterest = strInterest
+        pTrans.sDelayUs    = sDelayUs
+        pTrans.dtDate      = dtDate
+        pTrans.strStatus   = sys.intern(strStatus)
+        pTrans.nCons       = g_pHostTable.intern(strCons)
+        pTrans.nProd       = g_pHostTable.intern(strProd) if (strProd != '') else -1
+        pTrans.nDataID     = nDataID
+        pTrans.nDataType   = nDataType
+        pTrans.nPayload    = nPayload
+        return pTrans
+
     @staticmethod
     def fromString(strLine, strConsumer):
         """
@@ -24,6 +24,9 @@
 from mininet.log import debug
 # from minindn.minindn import Minindn
 import time 
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 SLEEP_TIME = 0.2
 
@@ -39,7 +42,15 @@ class Nfdc(object):
     @staticmethod
     def registerRoute(node, namePrefix, remoteNodeAddress, protocol=PROTOCOL_UDP, origin=255,
                       cost=0, inheritFlag=True, captureFlag=False, expirationInMillis=None):
-        cmd = ('nfdc route add {} {}://{} origin {} cost {} {}{}{}').format(
+        cmd = Nfdc.registerRouteCmd(namePrefix, remoteNodeAddress, protocol, origin, cost,
+                                    inheritFlag, captureFlag, expirationInMillis)
+        debug(node.cmd(cmd))
+        time.sleep(SLEEP_TIME)
+
+    @staticmethod
+    def registerRouteCmd(namePrefix, remoteNodeAddress, protocol=PROTOCOL_UDP, origin=255,
+                         cost=0, inheritFlag=True, captureFlag=False, expirationInMillis=None):
+        return ('nfdc route add {} {}://{} origin {} cost {} {}{}{}').format(
             namePrefix,
             protocol,
             remoteNodeAddress,
@@ -50,9 +61,6 @@ class Nfdc(object):
             'expires {}'.format(expirationInMillis) if expirationInMillis else ''
         )
 
-        debug(node.cmd(cmd))
-        time.sleep(SLEEP_TIME)
-
     @staticmethod
     def unregisterRoute(node, namePrefix, remoteNodeAddress, origin=255):
         cmd = 'nfdc route remove {} {} {}'.format(namePrefix, remoteNodeAddress, origin)
@@ -61,13 +69,17 @@ class Nfdc(object):
 
     @staticmethod
     def createFace(node, remoteNodeAddress, protocol='udp', isPermanent=False):
-        cmd = ('nfdc face create {}://{} {}'.format(
+        cmd = Nfdc.createFaceCmd(remoteNodeAddress, protocol, isPermanent)
+        debug(node.cmd(cmd))
+        time.sleep(SLEEP_TIME)
+
+    @staticmethod
+    def createFaceCmd(remoteNodeAddress, protocol='udp', isPermanent=False):
+        return 'nfdc face create {}://{} {}'.format(
             protocol,
             remoteNodeAddress,
             'permanent' if isPermanent else 'persistent'
-        ))
-        debug(node.cmd(cmd))
-        time.sleep(SLEEP_TIME)
+        )
 
     @staticmethod
     def destroyFace(node, remoteNodeAddress, protocol='udp'):
@@ -76,11 +88,84 @@ class Nfdc(object):
 
     @staticmethod
     def setStrategy(node, namePrefix, strategy):
-        cmd = 'nfdc strategy set {} ndn:/localhost/nfd/strategy/{}'.format(namePrefix, strategy)
+        cmd = Nfdc.setStrategyCmd(namePrefix, strategy)
         debug(node.cmd(cmd))
         time.sleep(SLEEP_TIME)
 
+    @staticmethod
+    def setStrategyCmd(namePrefix, strategy):
+        return 'nfdc strategy set {} ndn:/localhost/nfd/strategy/{}'.format(namePrefix, strategy)
+
     @staticmethod
     def unsetStrategy(node, namePrefix):
         debug(node.cmd("nfdc strategy unset {}".format(namePrefix)))
         time.sleep(SLEEP_TIME)
+
+class NfdcBatch(object):
+    """
+    Accumulates nfdc commands per node and runs them as one shell script per node,
+    all nodes in parallel. Commands of a node run in the order they were added,
+    without the sleep between calls, so faces must be added before the routes using them.
+    """
+    MAX_WORKERS = 32
+
+    def __init__(self):
+        self.nodes = OrderedDict()
+        self.commands = OrderedDict()
+
+    def __len__(self):
+        return sum(len(cmds) for cmds in self.commands.values())
+
+    def add(self, node, cmd):
+        if node.name not in self.commands:
+            self.nodes[node.name] = node
+            self.commands[node.name] = []
+        self.commands[node.name].append(cmd)
+
+    def createFace(self, node, remoteNodeAddress, protocol='udp', isPermanent=False):
+        self.add(node, Nfdc.createFaceCmd(remoteNodeAddress, protocol, isPermanent))
+
+    def registerRoute(self, node, namePrefix, remoteNodeAddress, protocol=Nfdc.PROTOCOL_UDP, origin=255,
+                      cost=0, inheritFlag=True, captureFlag=False, expirationInMillis=None):
+        self.add(node, Nfdc.registerRouteCmd(namePrefix, remoteNodeAddress, protocol, origin, cost,
+                                             inheritFlag, captureFlag, expirationInMillis))
+
+    def setStrategy(self, node, namePrefix, strategy):
+        self.add(node, Nfdc.setStrategyCmd(namePrefix, strategy))
+
+    def scriptFor(self, nodeName):
+        """
+        Returns the shell script with all commands of a node. nfdc reads the
+        client configuration from HOME, which is the node's home directory.
+        """
+        node = self.nodes[nodeName]
+        lines = []
+        homeDir = node.params.get('params', {}).get('homeDir') if hasattr(node, 'params') else None
+        if homeDir:
+            lines.append('export HOME={}'.format(homeDir))
+        lines.extend(self.commands[nodeName])
+        return '\n'.join(lines) + '\n'
+
+    def runNode(self, nodeName):
+        """
+        Runs the script of one node, returns (nodeName, returncode, output)
+        """
+        proc = self.nodes[nodeName].popen(['sh', '-s'], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                          stderr=subprocess.STDOUT)
+        output = proc.communicate(self.scriptFor(nodeName).encode('utf-8'))[0]
+        return (nodeName, proc.returncode, output.decode('utf-8', 'replace'))
+
+    def run(self, maxWorkers=MAX_WORKERS):
+        """
+        Runs the commands of every node and clears the batch. Returns a dict
+        with the output of each node.
+        """
+        outputs = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(maxWorkers, len(self.commands)))) as pool:
+            for (nodeName, returnCode, output) in pool.map(self.runNode, list(self.commands.keys())):
+                debug('[NfdcBatch] node={} commands={} returncode={}\n{}'.format(
+                    nodeName, len(self.commands[nodeName]), returnCode, output))
+                outputs[nodeName] = output
+        self.nodes = OrderedDict()
+        self.commands = OrderedDict()
+        return outputs
@@ -10,6 +10,7 @@ import os
 from process_topology import Topology
 from icnexperiment.data_generation import DataManager
 from icnexperiment.dir_config import c_strLogDir 
+from icnexperiment.generics import g_pHostTable, c_strHostTableFile
 from random_talks import RandomTalks
 from read_nfd_results import readNfdResults
 
@@ -25,9 +26,13 @@ def main():
    strTopoPath = ''
    sCacheRatio = 1.0
    nIterations = 1
+   nStartMs = None
+   nEndMs = None
+   bAsync = False
+   bUseAgents = False
 
    short_options = 'hmt:'
-   long_options  = ['help', 'mock', 'sdn', 'icn', 'ip', 'ip_sdn', 'icn_sdn', 'topo=', 'time=', 'cache-ratio=', 'iterations=']
+   long_options  = ['help', 'mock', 'sdn', 'icn', 'ip', 'ip_sdn', 'icn_sdn', 'topo=', 'time=', 'cache-ratio=', 'iterations=', 'start-ms=', 'end-ms=', 'async', 'agents']
    opts, args = getopt.getopt(sys.argv[1:], short_options, long_options)
    for opt, arg in opts:
       if opt in ['-h', '--help']:
@@ -53,12 +58,18 @@ def main():
          sCacheRatio = float(arg)
       elif opt == '--iterations':
          nIterations = int(arg)
-
-   # Load data queue
+      elif opt == '--start-ms':
+         nStartMs = int(arg)
+      elif opt == '--end-ms':
+         nEndMs = int(arg)
+      elif opt == '--async':
+         bAsync = True
+      elif opt == '--agents':
+         bUseAgents = True
+
+   # Data queue is streamed from file once per iteration
    if (strTopoPath != ''):
-      lstDataQueue = DataManager.loadDataQueueFromTextFile(strTopoPath)
-      # lstDataQueue = list()
-      logging.info('[main] Data queue size=%d' % len(lstDataQueue))
+      logging.info('[main] Data queue for topo=%s' % strTopoPath)
    else:
       logging.error('[main] No topology file specified!')
       showHelp()
@@ -73,11 +84,14 @@ def main():
    nIterationsCompleted = 0
    while(nIterationsCompleted < nIterations):
       logging.info('[main] Begin experiment %d out of %d' % (nIterationsCompleted+1, nIterations))
-      Experiment = RandomTalks(topo.net.stations, lstDataQueue)
+      Experiment = RandomTalks(topo.net.stations, DataManager.streamDataQueue(strTopoPath, nStartMs=nStartMs, nEndMs=nEndMs), nStartMs or 0, bUseAgents)
       try:
          Experiment.setup()
          topo.runTsharkOnStations()
-         (dtBegin, dtEnd) = Experiment.run(nTimeSecs)
+         if (bAsync):
+            (dtBegin, dtEnd) = Experiment.runAsync(nTimeSecs)
+         else:
+            (dtBegin, dtEnd) = Experiment.run(nTimeSecs)
          topo.stopTsharkOnStations()
          nIterationsCompleted += 1
 
@@ -141,6 +155,8 @@ def copyNdnLogs(strMode, strTopoPath, iteration):
    error = True # disable file exclusion
    if not os.path.exists(dstFolder):
        os.makedirs(dstFolder)
+   # Host names are written once, result analysis reads ids in the same order
+   g_pHostTable.saveToFile(os.path.join(dstFolder, c_strHostTableFile))
    for dirToCopy in srcDirs:
       fullSrcName = os.path.join(srcFolder, dirToCopy, 'nfd.log')
       fullDstName = os.path.join(dstFolder, dirToCopy)
@@ -169,6 +185,10 @@ def showHelp():
    strHelp += '  --icn:    ICN experiment without specific controller\n'
    strHelp += '  --ip:     IP experiment, no specific controller or cache\n'
    strHelp += '  --ip_sdn: IP with SDN experiment, with Ryu controller and no cache\n'
+   strHelp += '  --start-ms <ms>: replays the queue starting at this mission time\n'
+   strHelp += '  --end-ms <ms>:   replays the queue until this mission time\n'
+   strHelp += '  --async:         launches producers and consumers without blocking the timeline\n'
+   strHelp += '  --agents:        launches producers and consumers through one agent per host instead of a popen each\n'
    print(strHelp)
 
 if (__name__ == '__main__'):
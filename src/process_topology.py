@@ -15,6 +15,7 @@ from mn_wifi.net import Mininet_wifi
 from minindn.apps.nlsr import Nlsr
 from minindn.apps.app_manager import AppManager
 from minindn.apps.tshark import Tshark
+from minindn.helpers.nfdc import NfdcBatch
 import configparser
 import logging
 import time
@@ -33,16 +34,25 @@ class Topology(object):
       self.lstStations = []
       self.lstAccessPoints = []
       self.lstLinks = []
+      # Name to node maps, updated as nodes are added
+      self.hshStations = {}
+      self.hshAccessPoints = {}
       # Mininet related
       self.lstNfdProcs = list()
       self.lstLogFiles = list()
       self.net = None
+      self.hshNetStations = {}
+      self.hshNetAps = {}
 
    def addStation(self, strName, **kwargs):
-      self.lstStations.append(Node(strName, **kwargs))
+      pNode = Node(strName, **kwargs)
+      self.lstStations.append(pNode)
+      self.hshStations[strName] = pNode
 
    def addAccessPoint(self, strName, **kwargs):
-      self.lstAccessPoints.append(Node(strName, **kwargs))
+      pNode = Node(strName, **kwargs)
+      self.lstAccessPoints.append(pNode)
+      self.hshAccessPoints[strName] = pNode
 
    def addLink(self, strNode1, strNode2, **kwargs):
       self.lstLinks.append(Link(strNode1, strNode2, **kwargs))
@@ -73,15 +83,17 @@ class Topology(object):
       privateDirs = [('/var/log', '/tmp/%(name)s/var/log'), ('/var/run', '/tmp/%(name)s/var/run'), ('/run', '/tmp/%(name)s/run'), '/var/mn']
       station = partial( Station, privateDirs=privateDirs )
       self.net = Mininet_wifi(station=station)
+      self.hshNetStations = {}
+      self.hshNetAps = {}
 
       # Add access points
       for topoAp in self.lstAccessPoints:
          topoAp.kwargs['client_isolation'] = True
-         self.net.addAccessPoint(topoAp.strName, protocols='OpenFlow13', ssid="simpletopo" + str(topoAp.strName), mode="g", channel="5", **topoAp.kwargs)
+         self.hshNetAps[topoAp.strName] = self.net.addAccessPoint(topoAp.strName, protocols='OpenFlow13', ssid="simpletopo" + str(topoAp.strName), mode="g", channel="5", **topoAp.kwargs)
 
       # Add stations
       for topoStation in self.lstStations:
-         self.net.addStation(topoStation.strName, **topoStation.kwargs)
+         self.hshNetStations[topoStation.strName] = self.net.addStation(topoStation.strName, **topoStation.kwargs)
 
       # Add controller
       c0 = self.net.addController('c0', controller=RemoteController, ip='127.0.0.1', port=6653)
@@ -91,8 +103,8 @@ class Topology(object):
 
       logging.info("[Topology.create] Associating Stations")
       for topoLink in self.lstLinks:
-         pNode1 = Topology.findNodeByName(topoLink.strNode1, self.net.aps + self.net.stations)
-         pNode2 = Topology.findNodeByName(topoLink.strNode2, self.net.aps + self.net.stations)
+         pNode1 = self.findNetNode(topoLink.strNode1)
+         pNode2 = self.findNetNode(topoLink.strNode2)
          if (pNode1 is None) or (pNode2 is None):
             raise Exception('Could not find name in node list name1=%s name2=%s' % (topoLink.strNode1, topoLink.strNode2))
          else:
@@ -142,7 +154,7 @@ class Topology(object):
             if (strIntf.find('wlan') >= 0):
                nMaxBandwidth = 50
                nBandLimit = int(self.getPriorityByHostName(hshAPs[pAp.name])*nMaxBandwidth)
-               pHost = Topology.findNodeByName(hshAPs[pAp.name], self.net.stations)
+               pHost = self.hshNetStations.get(hshAPs[pAp.name])
                logging.info('[Topology.setSdnFilters] Host %s for ap %s via %s has nBandLimit=%d' % (pHost.name, strIntf, pAp.name, nBandLimit))
                subprocess.Popen('tc qdisc del dev %s root' % strIntf, shell=True)
                subprocess.Popen('tc qdisc add dev %s root handle 1: htb default 1 direct_qlen 1000' % strIntf, shell=True)
@@ -209,14 +221,16 @@ class Topology(object):
    def createNfdRoutes(self):
       logging.info('[Topology.createNfdRoutes] Creating routes for %d stations and %d APs' % (len(self.net.stations), len(self.net.aps)))
       lstHostLinks = self.abstractApsFromLinks()
+      # Commands are collected per station and run as one script per station, all stations in parallel
+      pBatch = NfdcBatch()
       # Create faces to all neighbouring hosts
       for pStation in self.net.stations:
          for topoLink in lstHostLinks:
             strDest = topoLink.connectsTo(pStation.name)
-            pDestHost = Topology.findNodeByName(strDest, self.net.stations)
+            pDestHost = self.hshNetStations.get(strDest)
             if (pDestHost):
                # logging.info('[Topology.createNfdRoutes] Host %s is connected to %s (%s)' % (pStation.name, pDestHost.name, pDestHost.IP()))
-               pStation.cmd('nfdc face create udp://' + pDestHost.IP())
+               pBatch.createFace(pStation, pDestHost.IP())
 
       # Create routes between faces
       # Create NX graph for the network topology
@@ -241,13 +255,16 @@ class Topology(object):
                lstPath = nx.shortest_path(pGraph, pStart.name, pEnd.name, weight='weight')
                if (len(lstPath) >= 2):
                   strNextHost = lstPath[1]
-                  pNextHost = Topology.findNodeByName(strNextHost, self.net.stations)
+                  pNextHost = self.hshNetStations[strNextHost]
                else:
                   raise Exception('There should be at least 2 hosts in the route between %s and %s' % (pStart.name, pEnd.name))
                # logging.info('[Topology.createNfdRoutes] Host %s for filter=%s, nextHost=%s (%s)' % (pStart.name, RandomTalks.getFilterByHostname(pEnd.name), pNextHost.name, pNextHost.IP()))
-               pStart.cmd('nfdc route add %s udp://%s' % (RandomTalks.getFilterByHostname(pEnd.name), pNextHost.IP()))
+               pBatch.registerRoute(pStart, RandomTalks.getFilterByHostname(pEnd.name), pNextHost.IP())
 
-      # logging.info('[Topology.createNfdRoutes] Done')
+      sStart = time.time()
+      nCommands = len(pBatch)
+      pBatch.run()
+      logging.info('[Topology.createNfdRoutes] Ran %d nfdc commands in %.2f seconds' % (nCommands, time.time() - sStart))
 
    def abstractApsFromLinks(self):
       """
@@ -401,6 +418,15 @@ class Topology(object):
 
       return topo
 
+   def findNetNode(self, strName):
+      """
+      Returns the Mininet station or access point named strName, None if there is none
+      """
+      pNode = self.hshNetStations.get(strName)
+      if (pNode is None):
+         pNode = self.hshNetAps.get(strName)
+      return pNode
+
    @staticmethod
    def findNodeByName(strName, lstNodes):
       for pNode in lstNodes:
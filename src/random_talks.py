@@ -11,37 +11,52 @@ import time
 import logging
 import getopt
 import psutil
+import asyncio
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from random   import randint
 from datetime import datetime, timedelta
 
 from icnexperiment.data_generation import DataManager, curDatetimeToFloat
+from icnexperiment.generics import g_pHostTable
+from icnexperiment.experiment_runner import EventScheduler, HostAgent
 
 # ---------------------------------------- Constants
-c_sConsumerCooldownSec    = 0.0
-c_nSleepThresholdMs       = 100
-g_bIsMockExperiment       = False
-g_dtLastProducerCheck     = None
-g_nProducerCheckPeriodSec = 5
+c_sConsumerCooldownSec     = 0.0
+c_bPayloadOnTmpfs          = False
+c_nAsyncLaunchWorkers      = 16
+c_sProducerReadyTimeoutSec = 2.0
+c_sProducerPollSec         = 0.02
+c_strHostAgentScript       = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'host_agent.py')
+g_bIsMockExperiment        = False
+g_dtLastProducerCheck      = None
+g_nProducerCheckPeriodSec  = 5
 
 # ---------------------------------------- RandomTalks
 class RandomTalks():
 
-   def __init__(self, lstHosts, lstDataQueue):
+   def __init__(self, lstHosts, lstDataQueue, nStartMs=0, bUseAgents=False):
       """
-      Constructor. Meh
+      Constructor. lstDataQueue can be any iterable of time ordered (nTimeMs, DataPackage) pairs,
+      such as a DataQueue or the generator returned by DataManager.streamDataQueue. It is consumed once by run().
+      nStartMs is the mission time when run() begins, used to replay a slice of the queue starting at that time.
+      With bUseAgents producers and consumers are launched by one HostAgent per host instead of a popen each.
       """
       self.logFile          = None
       self.pDataManager     = DataManager()
-      self.lstHosts         = lstHosts
+      self.lstHosts         = list(lstHosts)
+      self.hshHosts         = {str(pHost): pHost for pHost in lstHosts}
       self.strTTLValues     = 'None'
       self.strPayloadValues = 'None'
-      self.lstDataQueue     = lstDataQueue
+      self.itDataQueue      = iter(lstDataQueue)
+      self.nStartMs         = nStartMs
       self.nBytesConsumed   = 0
       self.hshConsumers     = {}
       self.strPayloadPath   = '/home/vagrant/mock_data'
       self.hshRunningProducers = {}
       self.hshRunningConsumers = {}
+      self.bUseAgents       = bUseAgents
+      self.hshAgents        = {}
 
    def setup(self):
       """
@@ -51,15 +66,21 @@ class RandomTalks():
       self.nBytesConsumed = 0
 
       self.hshConsumers = {}
+      self.hshHosts     = {}
       for pHost in self.lstHosts:
          self.hshConsumers[str(pHost)] = datetime(1,1,1,0,0)
+         self.hshHosts[str(pHost)] = pHost
+
+      # Host ids follow the host list order when the table is still empty
+      g_pHostTable.internAll([str(pHost) for pHost in self.lstHosts])
 
       # Get TTLs from data manager
       self.strTTLValues     = self.pDataManager.getTTLValuesParam()
       self.strPayloadValues = self.pDataManager.getPayloadValuesParam()
 
-      # Create payload mock files
-      DataManager.createPayloadFiles(self.lstDataQueue, self.strPayloadPath)
+      # Create payload mock files for every known data type, the queue is only read while running.
+      # Returns once all files are ready, so no producer starts before its file exists
+      self.strPayloadPath = DataManager.createPayloadFilesForSizes(self.pDataManager.getPayloadSizes(), self.strPayloadPath, c_bPayloadOnTmpfs)
 
       # Get average payload size from DataManager. This will be used to set cache sizes in the future
       sPayloadAvg = self.pDataManager.avgPayloadSize()
@@ -68,6 +89,9 @@ class RandomTalks():
       # Instantiate all producers
       # self.checkRunningProducers()
 
+      if (self.bUseAgents) and (not g_bIsMockExperiment):
+         self.startAgents()
+
       # Log the current configuration for data_manager
       logging.debug('[RandomTalks.setup] Current data type configuration: \n%s' % self.pDataManager.info())
       logging.debug('[RandomTalks.setup] Note that this could be outdated since the data queue configuration is set when it is created!')
@@ -78,72 +102,145 @@ class RandomTalks():
       """
       logging.info('[RandomTalks.run] Begin, maxExperimentTimeSec=%d' % nTimeSecs)
 
-      # Internal parameters
-      dtBegin        = datetime.now()
-      dtNow          = None
-      dtDelta        = timedelta()
-      nDataIndex     = 0
-      sElapsedTimeMs = 0
-      nIteration     = 0
-      sTimeDiffSum   = 0
-      sTimeDiffAvg   = 0
-      while (((sElapsedTimeMs/1000) < nTimeSecs) and (nDataIndex < len(self.lstDataQueue))):
-         # Send data until the end of the experiment time
-         # Sweep queue and send data according to the elapsed time
-         dtNow      = datetime.now()
-         dtDelta        = dtNow - dtBegin
-         sElapsedTimeMs = dtDelta.microseconds/1000 + dtDelta.seconds*1000
-         nIteration    += 1
-         logging.debug('[RandomTalks.run] New iteration with sElapsedTimeMs=%s; dtDelta=%s' % (sElapsedTimeMs, str(dtDelta)))
-
-         while (nDataIndex < len(self.lstDataQueue)) and (self.lstDataQueue[nDataIndex][0] <= sElapsedTimeMs):
-            # Send data
-            pDataBuff = self.lstDataQueue[nDataIndex]
-
-            sTimeDiffMs   = sElapsedTimeMs - pDataBuff[0]
-            sTimeDiffSum += sTimeDiffMs
-            sTimeDiffAvg  = float(sTimeDiffSum)/(nDataIndex+1)
-
-            if (sTimeDiffMs > 5):
-               logging.info('[RandomTalks.run] About to send data nDataIndex=%d/%d; elapsedSec=%s; timeDiffMs=%s, timeDiffAvg=%.2f, MBytesConsumed=%.3f' % (nDataIndex, len(self.lstDataQueue)-1, sElapsedTimeMs/1000.0, sTimeDiffMs, sTimeDiffAvg, self.nBytesConsumed/(1024.0*1024.0)))
-
-            # Instantiate consumer and producer host associated in the data package
-            pDataPackage = pDataBuff[1]
-            pProducer = self.findHostByName(pDataPackage.strOrig)
-            pConsumer = self.findHostByName(pDataPackage.strDest)
-
-            # In some setups, producer hosts might be killed by the OS for an unknown reason
-            # This makes sure producers are running correctly during the simulation
-            # As of 03/2021 this is not happening anymore. Possibly because of the call to getPopen(pHost, strCmdConsumer) instead of pHost.cmd (??)
-            # self.checkRunningProducers()
-            if ((sElapsedTimeMs/1000) > nTimeSecs):
-               break
-
-            if(not self.isProducerRunning(pDataPackage)):
-               self.instantiateProducer(pProducer, pDataPackage)
-               time.sleep(0.2)
+      # Events are dispatched by a monotonic scheduler at their mission time
+      dtBegin         = datetime.now()
+      self.nDataIndex = 0
+      self.pScheduler = EventScheduler(self.nStartMs)
+      self.pScheduler.run(self.itDataQueue, self.dispatchData, nTimeSecs)
 
-            self.instantiateConsumer(pConsumer, pDataPackage)
-            nDataIndex += 1
-
-         if (nDataIndex < len(self.lstDataQueue)):
-            logging.debug('[RandomTalks.run] Waiting to send next data package nDataIndex=%s; pDataBuff[0]=%s; sElapsedTimeMs=%s' %
-               (nDataIndex, self.lstDataQueue[nDataIndex][0], sElapsedTimeMs))
-         else:
-            logging.info('[RandomTalks.run] No more data to send')
-
-         # Wait until next data is ready, if past threshold
-         if (nDataIndex < len(self.lstDataQueue)):
-            nNextStopMs = self.lstDataQueue[nDataIndex][0] - sElapsedTimeMs
-            if (nNextStopMs > c_nSleepThresholdMs):
-               logging.info('[RandomTalks.run] Sleeping until next data nNextStopMs=%s; c_nSleepThresholdMs=%s' % (nNextStopMs, c_nSleepThresholdMs))
-               time.sleep(nNextStopMs/1000.0)
+      logging.info('[RandomTalks.run] Dispatched %d data packages, lateness %s' % (self.nDataIndex, self.pScheduler.pStats.summary()))
 
       # Close log file
       # self.killAllProducers()
-      logging.info('[RandomTalks.run] Experiment done in %s seconds' % (sElapsedTimeMs/1000))
+      self.closeAgents()
+      logging.info('[RandomTalks.run] Experiment done in %s seconds' % (self.pScheduler.elapsedMs()/1000))
+      return (dtBegin, datetime.now())
+
+   def runAsync(self, nTimeSecs):
+      """
+      Experiment routine in asyncio mode. Processes are launched from a thread pool, so the timeline never waits for
+      popen, and consumers wait for their producer's prefix to be registered instead of a fixed sleep.
+      Returns tuple (dtBegin, dtEnd).
+      """
+      logging.info('[RandomTalks.runAsync] Begin, maxExperimentTimeSec=%d' % nTimeSecs)
+      dtBegin = datetime.now()
+      asyncio.run(self.runTimelineAsync(nTimeSecs))
+      self.closeAgents()
+      logging.info('[RandomTalks.runAsync] Dispatched %d data packages, lateness %s' % (self.nDataIndex, self.pScheduler.pStats.summary()))
+      logging.info('[RandomTalks.runAsync] Experiment done in %s seconds' % (self.pScheduler.elapsedMs()/1000))
       return (dtBegin, datetime.now())
 
+   async def runTimelineAsync(self, nTimeSecs):
+      self.nDataIndex       = 0
+      self.pScheduler       = EventScheduler(self.nStartMs)
+      self.pExecutor        = ThreadPoolExecutor(max_workers=c_nAsyncLaunchWorkers)
+      self.hshProducerTasks = {}
+      self.setLaunchTasks   = set()
+      try:
+         await self.pScheduler.runAsync(self.itDataQueue, self.dispatchDataAsync, nTimeSecs)
+         # Let launches still in progress finish
+         lstResults = await asyncio.gather(*self.setLaunchTasks, return_exceptions=True)
+         for pResult in lstResults:
+            if (isinstance(pResult, Exception)):
+               logging.error('[RandomTalks.runTimelineAsync] Launch failed with exception %s' % str(pResult))
+      finally:
+         self.pExecutor.shutdown(wait=True)
+
+   def dispatchDataAsync(self, nDataTimeMs, pDataPackage):
+      """
+      Non blocking dispatchData. Starts the producer for the package's name prefix once, the consumer task waits for it.
+      """
+      pProducer = self.findHostByName(pDataPackage.strOrig)
+      pConsumer = self.findHostByName(pDataPackage.strDest)
+      strFilter = RandomTalks.getChunksFilter(pDataPackage.strOrig, pDataPackage.nType, pDataPackage.nID)
+
+      pProducerTask = self.hshProducerTasks.get(strFilter)
+      if (pProducerTask is None) or (pProducerTask.done() and not self.isProducerRunning(pDataPackage)):
+         pProducerTask = self.createLaunchTask(self.startProducerAsync(pProducer, pDataPackage, strFilter))
+         self.hshProducerTasks[strFilter] = pProducerTask
+
+      self.createLaunchTask(self.startConsumerAsync(pConsumer, pDataPackage, pProducerTask))
+      self.nDataIndex += 1
+
+   def createLaunchTask(self, pCoroutine):
+      pTask = asyncio.ensure_future(pCoroutine)
+      self.setLaunchTasks.add(pTask)
+      pTask.add_done_callback(self.setLaunchTasks.discard)
+      return pTask
+
+   async def startProducerAsync(self, pHost, pDataPackage, strFilter):
+      """
+      Launches the producer from the thread pool and waits until its prefix is registered
+      """
+      global g_bIsMockExperiment
+      if (not pHost):
+         logging.critical('[RandomTalks.startProducerAsync] Producer is nil!')
+         return False
+      if (g_bIsMockExperiment):
+         return True
+
+      pLoop = asyncio.get_running_loop()
+      nPid  = await pLoop.run_in_executor(self.pExecutor, self.launchProducer, pHost, pDataPackage)
+      self.addProducerProcess(pHost.name, nPid, strFilter)
+      return await self.waitProducerReady(pHost, strFilter)
+
+   async def waitProducerReady(self, pHost, strFilter):
+      """
+      Polls the producer host's RIB until the producer prefix shows up, at most c_sProducerReadyTimeoutSec
+      """
+      pLoop     = asyncio.get_running_loop()
+      strPrefix = 'prefix=%s ' % strFilter.rstrip('/')
+      sDeadline = time.monotonic() + c_sProducerReadyTimeoutSec
+      while (time.monotonic() < sDeadline):
+         strRoutes = await pLoop.run_in_executor(self.pExecutor, RandomTalks.readRoutes, pHost)
+         if (strPrefix in strRoutes):
+            return True
+         await asyncio.sleep(c_sProducerPollSec)
+      logging.warning('[RandomTalks.waitProducerReady] Prefix=%s not registered on host=%s after %.1f seconds' % (strFilter, pHost.name, c_sProducerReadyTimeoutSec))
+      return False
+
+   async def startConsumerAsync(self, pHost, pDataPackage, pProducerTask):
+      """
+      Waits for the producer, then launches the consumer from the thread pool
+      """
+      global g_bIsMockExperiment
+      if (not pHost):
+         logging.critical('[RandomTalks.startConsumerAsync] Host is nil! host=%s' % str(pHost))
+         return
+      # Shielded, the producer task is shared by every consumer of the same name
+      await asyncio.shield(pProducerTask)
+
+      sSecSinceLast = (datetime.now() - self.hshConsumers[str(pHost)]).total_seconds()
+      if (sSecSinceLast < c_sConsumerCooldownSec):
+         await asyncio.sleep(c_sConsumerCooldownSec - sSecSinceLast)
+
+      strCmd = self.consumerCommand(pDataPackage)
+      self.nBytesConsumed += pDataPackage.nPayloadSize
+      logging.info('[RandomTalks.startConsumerAsync] %s ConsumerCmd: %s' % (pHost.name, strCmd))
+      if (not g_bIsMockExperiment):
+         pLoop = asyncio.get_running_loop()
+         nPid  = await pLoop.run_in_executor(self.pExecutor, self.launchConsumer, pHost, pDataPackage)
+         self.addConsumerProcess(pHost.name, nPid)
+
+   def dispatchData(self, nDataTimeMs, pDataPackage):
+      """
+      Sends one data package: starts its producer if needed and the consumer. Called by the scheduler at nDataTimeMs.
+      """
+      # Instantiate consumer and producer host associated in the data package
+      pProducer = self.findHostByName(pDataPackage.strOrig)
+      pConsumer = self.findHostByName(pDataPackage.strDest)
+
+      # In some setups, producer hosts might be killed by the OS for an unknown reason
+      # This makes sure producers are running correctly during the simulation
+      # As of 03/2021 this is not happening anymore. Possibly because of the call to getPopen(pHost, strCmdConsumer) instead of pHost.cmd (??)
+      # self.checkRunningProducers()
+      if(not self.isProducerRunning(pDataPackage)):
+         self.instantiateProducer(pProducer, pDataPackage)
+         time.sleep(0.2)
+
+      self.instantiateConsumer(pConsumer, pDataPackage)
+      self.nDataIndex += 1
+
    def checkRunningProducers(self):
       """
       Checks for all producer processes periodicaly. The period is set by g_nProducerCheckPeriodSec.
@@ -184,19 +281,17 @@ class RandomTalks():
       """
       global g_bIsMockExperiment
       if (pHost):
-         nTTL = self.pDataManager.getTTLForDataType(pDataPackage.nType)
          strFilter = RandomTalks.getChunksFilter(pDataPackage.strOrig, pDataPackage.nType, pDataPackage.nID)
-         strFilePath = DataManager.nameForPayloadFile(pDataPackage.nPayloadSize, self.strPayloadPath)
-         strCmd = 'ndnputchunks %s -f %d < %s -q' % (strFilter, nTTL, strFilePath)
+         strCmd = self.producerCommand(pDataPackage)
          if (not g_bIsMockExperiment):
             # getPopen(pHost, strCmd, shell=True)
             try:
-               proc = pHost.popen(strCmd, shell=True)
+               nPid = self.launchProducer(pHost, pDataPackage)
             except:
                logging.error('[RandomTalks.instantiateProducer] Exception raised')
 
          # logging.info('[RandomTalks.instantiateProducer] ProducerCmd: ' + strCmd)
-         self.addProducerProcess(pHost.name, proc.pid, strFilter)
+         self.addProducerProcess(pHost.name, nPid, strFilter)
       else:
          logging.critical('[RandomTalks.instantiateProducer] Producer is nil!')
 
@@ -212,22 +307,73 @@ class RandomTalks():
             logging.info('[RandomTalks.instantiateConsumer] Will wait seconds=%.2f' % (c_sConsumerCooldownSec - sSecSinceLast))
             time.sleep(c_sConsumerCooldownSec - sSecSinceLast)
 
-         strInterest = RandomTalks.getChunksFilter(pDataPackage.strOrig, pDataPackage.nType, pDataPackage.nID)
-         strCmd = 'ndncatchunks %s -q' % strInterest
+         strCmd = self.consumerCommand(pDataPackage)
          if (not g_bIsMockExperiment):
             # getPopen(pHost, strCmd, shell=True)
             try:
-               proc = pHost.popen(strCmd, shell=True)
+               nPid = self.launchConsumer(pHost, pDataPackage)
             except:
                logging.error('[RandomTalks.instantiateConsumer] Exception raised')
 
          self.nBytesConsumed += pDataPackage.nPayloadSize
          logging.info('[RandomTalks.instantiateConsumer] %s ConsumerCmd: %s' % (pHost.name, strCmd))
 
-         self.addConsumerProcess(pHost.name, proc.pid)
+         self.addConsumerProcess(pHost.name, nPid)
       else:
          logging.critical('[RandomTalks.instantiateConsumer] Host is nil! host=%s' % str(pHost))
 
+   def launchProducer(self, pHost, pDataPackage):
+      """
+      Starts the producer for a data package on pHost, through its agent when there is one. Returns the pid.
+      """
+      pAgent = self.hshAgents.get(pHost.name)
+      if (pAgent):
+         strFilter = RandomTalks.getChunksFilter(pDataPackage.strOrig, pDataPackage.nType, pDataPackage.nID)
+         strFilePath = DataManager.nameForPayloadFile(pDataPackage.nPayloadSize, self.strPayloadPath)
+         return pAgent.serve(strFilter, self.pDataManager.getTTLForDataType(pDataPackage.nType), strFilePath)
+      return pHost.popen(self.producerCommand(pDataPackage), shell=True).pid
+
+   def launchConsumer(self, pHost, pDataPackage):
+      """
+      Starts the consumer for a data package on pHost, through its agent when there is one. Returns the pid.
+      """
+      pAgent = self.hshAgents.get(pHost.name)
+      if (pAgent):
+         return pAgent.fetch(RandomTalks.getChunksFilter(pDataPackage.strOrig, pDataPackage.nType, pDataPackage.nID))
+      return pHost.popen(self.consumerCommand(pDataPackage), shell=True).pid
+
+   def startAgents(self):
+      """
+      Starts one HostAgent per host. Hosts whose agent fails to start fall back to popen.
+      """
+      for pHost in self.lstHosts:
+         try:
+            self.hshAgents[pHost.name] = HostAgent(pHost, c_strHostAgentScript)
+         except Exception as e:
+            logging.error('[RandomTalks.startAgents] Could not start agent on host=%s, error=%s' % (pHost.name, str(e)))
+      logging.info('[RandomTalks.startAgents] Started %d host agents' % len(self.hshAgents))
+
+   def closeAgents(self):
+      for pAgent in self.hshAgents.values():
+         pAgent.close()
+      self.hshAgents = {}
+
+   def producerCommand(self, pDataPackage):
+      """
+      Returns the shell command that serves a data package
+      """
+      nTTL = self.pDataManager.getTTLForDataType(pDataPackage.nType)
+      strFilter = RandomTalks.getChunksFilter(pDataPackage.strOrig, pDataPackage.nType, pDataPackage.nID)
+      strFilePath = DataManager.nameForPayloadFile(pDataPackage.nPayloadSize, self.strPayloadPath)
+      return 'ndnputchunks %s -f %d < %s -q' % (strFilter, nTTL, strFilePath)
+
+   def consumerCommand(self, pDataPackage):
+      """
+      Returns the shell command that fetches a data package
+      """
+      strInterest = RandomTalks.getChunksFilter(pDataPackage.strOrig, pDataPackage.nType, pDataPackage.nID)
+      return 'ndncatchunks %s -q' % strInterest
+
    def addConsumerProcess(self, strHost, pid):
       nMaxProcsPerHost = 25
       if (strHost not in self.hshRunningConsumers):
@@ -269,15 +415,29 @@ class RandomTalks():
          for [proc, strInterest] in self.hshRunningProducers[strHost]:
             proc.kill()
 
+   def addHost(self, pHost):
+      """
+      Adds a host to the experiment, keeping the name lookup up to date
+      """
+      self.lstHosts.append(pHost)
+      self.hshHosts[str(pHost)] = pHost
+      self.hshConsumers[str(pHost)] = datetime(1,1,1,0,0)
+      g_pHostTable.intern(str(pHost))
+
    def findHostByName(self, strHostName):
       """
-      Returns a host found in the host list.
+      Returns a host found in the host list, None if there is none.
       """
-      pResultHost = None
-      for pHost in self.lstHosts:
-         if (str(pHost) == strHostName):
-            pResultHost = pHost
-      return pResultHost
+      return self.hshHosts.get(strHostName)
+
+   @staticmethod
+   def readRoutes(pHost):
+      """
+      Returns the output of 'nfdc route list' run on pHost
+      """
+      proc = pHost.popen(['nfdc', 'route', 'list'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+      (bytOutput, bytError) = proc.communicate()
+      return bytOutput.decode('utf-8', 'replace')
 
    @staticmethod
    def getFilterByHostname(strName):
@@ -42,15 +42,10 @@ def main():
 
 def readNfdResults(strTopoPath, strLogPath='/tmp/icnsimulations'):
 
-    lstData = DataManager.loadDataQueueFromTextFile(strTopoPath)
+    lstData = DataManager.loadDataQueue(strTopoPath)
 
     # Get hostnames from the data queue
-    lstHostNames = []
-    for [nTimestamp, pDataPackage] in lstData:
-        if (pDataPackage.strOrig not in lstHostNames):
-            lstHostNames.append(pDataPackage.strOrig)
-        if (pDataPackage.strDest not in lstHostNames):
-            lstHostNames.append(pDataPackage.strDest)
+    lstHostNames = lstData.getHostNames()
 
     hshNodes = readNFDLogs(strLogPath, lstData, lstHostNames)
 